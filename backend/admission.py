@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+from metrics import Counter, Gauge
+
+load_dotenv()
+
+# Per-worker admission control for expensive dashboard work (cold builds and section refreshes):
+# at most DASHBOARD_BUILD_CONCURRENCY run at once, DASHBOARD_BUILD_QUEUE more may wait up to
+# DASHBOARD_BUILD_QUEUE_TIMEOUT seconds for a slot; anything beyond that is shed.
+DASHBOARD_BUILD_CONCURRENCY = int(os.getenv("DASHBOARD_BUILD_CONCURRENCY", "16"))
+DASHBOARD_BUILD_QUEUE = int(os.getenv("DASHBOARD_BUILD_QUEUE", "32"))
+DASHBOARD_BUILD_QUEUE_TIMEOUT = float(os.getenv("DASHBOARD_BUILD_QUEUE_TIMEOUT", "2"))
+
+# Per-user sliding window on POST /dashboard/refresh/{section}
+REFRESH_RATE_LIMIT = int(os.getenv("REFRESH_RATE_LIMIT", "10"))  # refreshes per window; 0 disables
+REFRESH_RATE_WINDOW = float(os.getenv("REFRESH_RATE_WINDOW", "60"))  # seconds
+
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "Requests not admitted, by controller and reason (queue_full, queue_timeout)",
+    ("controller", "reason"),
+)
+RATE_LIMITED = Counter("rate_limited_total", "Requests refused by a per-user rate limiter", ("limiter",))
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("server overloaded")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded semaphore with a bounded, deadline-limited wait queue in front of it.
+    """
+
+    def __init__(self, name: str, limit: int, queue_max: int, queue_timeout: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_max = max(0, queue_max)
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(self.limit)
+        self.running = 0
+        self.waiting = 0
+        self.counts = {"admitted": 0, "shed": 0}
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(self.queue_timeout + 0.999))
+
+    def saturated(self) -> bool:
+        """
+        True when a new request would be shed right away (all slots busy and the queue full).
+        """
+        return self.running >= self.limit and self.waiting >= self.queue_max
+
+    def _shed(self, reason: str):
+        self.counts["shed"] += 1
+        ADMISSION_SHED.inc(controller=self.name, reason=reason)
+        raise Overloaded(self.retry_after)
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Holds a slot for the block; raises Overloaded if the queue is full or the wait times out.
+        """
+        if self.running >= self.limit and self.waiting >= self.queue_max:
+            self._shed("queue_full")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._shed("queue_timeout")
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        self.counts["admitted"] += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "running": self.running,
+            "waiting": self.waiting,
+            "limit": self.limit,
+            "queue_max": self.queue_max,
+            "queue_timeout_s": self.queue_timeout,
+        }
+
+
+class SlidingWindowLimiter:
+    """
+    At most `limit` hits per key within any `window` seconds (sliding log of hit times).
+    Keys are kept LRU-bounded so idle users don't accumulate.
+    """
+
+    def __init__(self, name: str, limit: int, window: float, maxsize: int = 100_000):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self._hits: OrderedDict = OrderedDict()  # key -> deque of monotonic hit times
+        self.counts = {"allowed": 0, "limited": 0}
+
+    def hit(self, key) -> float | None:
+        """
+        Records a hit; returns None if allowed, else seconds until the oldest hit leaves the window.
+        """
+        if self.limit <= 0:
+            return None
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+            while len(self._hits) > self.maxsize:
+                self._hits.popitem(last=False)
+        self._hits.move_to_end(key)
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if len(hits) >= self.limit:
+            self.counts["limited"] += 1
+            RATE_LIMITED.inc(limiter=self.name)
+            return hits[0] + self.window - now
+        hits.append(now)
+        self.counts["allowed"] += 1
+        return None
+
+    def stats(self) -> dict:
+        return {**self.counts, "limit": self.limit, "window_s": self.window, "keys": len(self._hits)}
+
+
+BUILD_ADMISSION = AdmissionController(
+    "dashboard_build", DASHBOARD_BUILD_CONCURRENCY, DASHBOARD_BUILD_QUEUE, DASHBOARD_BUILD_QUEUE_TIMEOUT,
+)
+REFRESH_LIMITER = SlidingWindowLimiter("dashboard_refresh", REFRESH_RATE_LIMIT, REFRESH_RATE_WINDOW)
+
+Gauge("admission_in_flight", "Admitted requests running", lambda: {("dashboard_build",): BUILD_ADMISSION.running},
+      ("controller",))
+Gauge("admission_waiting", "Requests waiting for a slot", lambda: {("dashboard_build",): BUILD_ADMISSION.waiting},
+      ("controller",))
+
+
+def admission_stats() -> dict:
+    return {"dashboard_build": BUILD_ADMISSION.stats(), "refresh_limiter": REFRESH_LIMITER.stats()}
@@ -0,0 +1,81 @@
+"""
+Login throughput vs bcrypt cost: concurrent password verifies pushed through
+the bounded bcrypt pool used by /login, for each cost factor.
+
+    cd backend
+    python -m bench.bcrypt_cost --costs 10,11,12 --logins 200 --concurrency 50 --out bench_bcrypt.json
+
+No database needed. PASSWORD_HASH_WORKERS / PASSWORD_HASH_QUEUE / PASSWORD_HASH_QUEUE_TIMEOUT
+are read from the environment like in the app; rejected logins are what /login would answer with 503.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords  # noqa: E402
+from bench.common import latency_summary, write_results  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+async def run_cost(cost: int, logins: int, concurrency: int) -> dict:
+    password_hash = passwords._hash(PASSWORD, cost)
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    rejected = 0
+
+    async def one():
+        nonlocal rejected
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await passwords.verify_password(PASSWORD, password_hash)
+            except passwords.PasswordHasherBusy:
+                rejected += 1
+                return
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "cost": cost,
+        "logins": logins,
+        "concurrency": concurrency,
+        "workers": passwords.PASSWORD_HASH_WORKERS,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_lps": round(len(latencies) / elapsed, 1),
+        "rejected": rejected,
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+async def amain(args):
+    costs = [int(c) for c in args.costs.split(",") if c.strip()]
+    return [await run_cost(cost, args.logins, args.concurrency) for cost in costs]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", default="10,11,12", help="comma-separated bcrypt cost factors")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(amain(args))
+    for r in results:
+        print(
+            f"cost {r['cost']:>2}: {r['throughput_lps']:>8} logins/s  "
+            f"p50={r['latency_ms']['p50']}ms p99={r['latency_ms']['p99']}ms  rejected={r['rejected']}"
+        )
+    write_results(args.out, "bcrypt_cost", results)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def pct(values: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile, rounded to 2 decimals (0.0 for no samples).
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p / 100))], 2)
+
+
+def latency_summary(latencies_ms: list[float]) -> dict:
+    return {"p50": pct(latencies_ms, 50), "p95": pct(latencies_ms, 95), "p99": pct(latencies_ms, 99)}
+
+
+def run_meta() -> dict:
+    """
+    Where a result came from, so runs on different commits/machines can be told apart.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path: str | None, benchmark: str, results, config: dict | None = None) -> None:
+    if not path:
+        return
+    out = {"benchmark": benchmark, "meta": run_meta(), "results": results}
+    if config is not None:
+        out["config"] = config
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
@@ -0,0 +1,162 @@
+"""
+Event-loop lag and throughput of concurrent dashboard loads:
+sync SQLAlchemy engine called from async code (the old path) vs the async engine.
+
+Each "load" is what GET /dashboard does against Postgres on a snapshot hit:
+read user_preferences, then the latest daily_dashboard snapshot.
+
+    cd backend
+    python -m bench.db_event_loop --users 50 --requests 2000 --concurrency 100 --out bench_db.json
+
+Needs DATABASE_URL pointing at a database with the app schema. Bench users
+(bench-db-<n>@example.invalid) and one snapshot each for today are created on first run.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+from db import init_db, engine, async_engine  # noqa: E402
+import main  # noqa: E402
+from bench.common import pct, latency_summary, write_results  # noqa: E402
+
+
+def seed_users(n: int) -> list[int]:
+    today = datetime.utcnow().date()
+    ids = []
+    with engine.begin() as conn:
+        for i in range(n):
+            email = f"bench-db-{i}@example.invalid"
+            uid = conn.execute(text("""
+                INSERT INTO users (name, email, password_hash)
+                VALUES (:name, :email, 'x')
+                ON CONFLICT (email) DO UPDATE SET name = EXCLUDED.name
+                RETURNING id
+            """), {"name": f"bench {i}", "email": email}).scalar()
+            conn.execute(text("""
+                INSERT INTO user_preferences (user_id, crypto_assets, investor_type, content_type)
+                VALUES (:id, CAST('["bitcoin","ethereum"]' AS jsonb), 'long_term', CAST('["market_news"]' AS jsonb))
+                ON CONFLICT (user_id) DO NOTHING
+            """), {"id": uid})
+            has_snapshot = conn.execute(
+                text("SELECT 1 FROM daily_dashboard WHERE user_id = :id AND day = :day LIMIT 1"),
+                {"id": uid, "day": today},
+            ).fetchone()
+            if not has_snapshot:
+                conn.execute(text("""
+                    INSERT INTO daily_dashboard (user_id, day, sections)
+                    VALUES (:id, :day, CAST(:sections AS jsonb))
+                """), {"id": uid, "day": today, "sections": json.dumps(main.mock_sections({}, today))})
+            ids.append(int(uid))
+    return ids
+
+
+async def load_sync(user_id: int):
+    # Old path: blocking driver calls made directly on the event loop
+    today = datetime.utcnow().date()
+    with engine.connect() as conn:
+        conn.execute(text("""
+            SELECT crypto_assets, investor_type, content_type
+            FROM user_preferences WHERE user_id = :id LIMIT 1
+        """), {"id": user_id}).fetchone()
+    with engine.connect() as conn:
+        conn.execute(text("""
+            SELECT id, sections FROM daily_dashboard
+            WHERE user_id = :user_id AND day = :day
+            ORDER BY created_at DESC LIMIT 1
+        """), {"user_id": user_id, "day": today}).fetchone()
+
+
+async def load_async(user_id: int):
+    today = datetime.utcnow().date()
+    async with async_engine.connect() as conn:
+        await main.load_user_preferences(conn, user_id)
+    async with async_engine.connect() as conn:
+        await main.load_daily_dashboard(conn, user_id, today)
+
+
+async def lag_monitor(stop: asyncio.Event, samples: list[float], interval: float = 0.01):
+    """
+    Event-loop lag = how late a `sleep(interval)` wakes up.
+    """
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - t0 - interval) * 1000)
+
+
+async def run_path(name: str, load, user_ids: list[int], requests: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    lag: list[float] = []
+    stop = asyncio.Event()
+
+    async def one(i: int):
+        async with sem:
+            t0 = time.perf_counter()
+            await load(user_ids[i % len(user_ids)])
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    monitor = asyncio.create_task(lag_monitor(stop, lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    return {
+        "path": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": latency_summary(latencies),
+        "loop_lag_ms": {
+            "mean": round(statistics.fmean(lag), 2) if lag else 0.0,
+            "p99": pct(lag, 99),
+            "max": round(max(lag), 2) if lag else 0.0,
+        },
+    }
+
+
+async def amain(args):
+    init_db()
+    user_ids = seed_users(args.users)
+
+    results = []
+    for name, load in (("sync_engine", load_sync), ("async_engine", load_async)):
+        await run_path(name, load, user_ids, min(args.requests, 50), args.concurrency)  # warm pools
+        results.append(await run_path(name, load, user_ids, args.requests, args.concurrency))
+    await async_engine.dispose()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(amain(args))
+    for r in results:
+        print(
+            f"{r['path']:>13}: {r['throughput_rps']:>8} req/s  "
+            f"p50={r['latency_ms']['p50']}ms p99={r['latency_ms']['p99']}ms  "
+            f"loop lag p99={r['loop_lag_ms']['p99']}ms max={r['loop_lag_ms']['max']}ms"
+        )
+    write_results(args.out, "db_event_loop", results)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,270 @@
+"""
+Load generator for the API: signs up and onboards N users, then drives GET /dashboard,
+POST /dashboard/refresh/{section} and POST /votes with a weighted mix, and reports
+throughput and p50/p95/p99 per endpoint.
+
+Offline setup (no network needed), three terminals:
+
+    cd backend
+    python -m bench.upstream_stubs --port 9100 --latency-ms 40 --latency-ms openrouter=400
+
+    DEV_MODE=false MARKET_INGEST_ENABLED=false LOG_LEVEL=WARNING \\
+    COINGECKO_BASE_URL=http://127.0.0.1:9100/coingecko/api/v3 \\
+    CRYPTOPANIC_BASE_URL=http://127.0.0.1:9100/cryptopanic/api/developer/v2 \\
+    OPENROUTER_BASE_URL=http://127.0.0.1:9100/openrouter/api/v1 \\
+    CRYPTOPANIC_TOKEN=stub OPENROUTER_API_KEY=stub BCRYPT_ROUNDS=4 \\
+    uvicorn main:app --port 8000
+
+    python -m bench.load --users 50 --duration 30 --concurrency 32 --out bench_load.json
+    python -m bench.load ... --compare bench_load.json   # later, on another commit
+
+Needs DATABASE_URL / JWT_SECRET for the API as usual. Users are bench-load-<n>@example.invalid;
+reruns log them in again instead of signing up.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from bench.common import latency_summary, write_results  # noqa: E402
+
+ASSETS = ["bitcoin", "ethereum", "solana", "cardano", "dogecoin", "ripple", "polkadot", "chainlink"]
+INVESTOR_TYPES = ["long_term", "short_term", "nft_collector", "swing_trader", "defi_yield"]
+CONTENT_TYPES = ["market_news", "charts", "fun", "development", "regulation", "security", "social"]
+REFRESHABLE = ["prices", "news", "ai_insight", "meme", "chart", "fun"]
+PASSWORD = "bench-password-123"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def add(self, endpoint: str, started: float, status: int | str):
+        self.latencies.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.add(endpoint, started, type(e).__name__)
+            return None
+        self.add(endpoint, started, r.status_code)
+        return r
+
+    def report(self, elapsed: float) -> dict:
+        out = {}
+        for endpoint, lat in self.latencies.items():
+            statuses = self.statuses[endpoint]
+            errors = sum(n for s, n in statuses.items() if not s.isdigit() or int(s) >= 500)
+            out[endpoint] = {
+                "requests": len(lat),
+                "throughput_rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+                "errors": errors,
+                "statuses": statuses,
+                "latency_ms": latency_summary(lat),
+            }
+        return out
+
+
+class BenchUser:
+    def __init__(self, n: int, rnd: random.Random):
+        self.email = f"bench-load-{n}@example.invalid"
+        self.prefs = {
+            "crypto_assets": rnd.sample(ASSETS, rnd.randint(1, 4)),
+            "investor_type": rnd.choice(INVESTOR_TYPES),
+            "content_type": rnd.sample(CONTENT_TYPES, rnd.randint(1, 3)),
+        }
+        self.token = None
+        self.dashboard_id = None
+        self.sections: dict = {}
+        self.etag = None
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def vote_target(self, rnd: random.Random) -> tuple[str, str]:
+        """
+        (section, item) the way the dashboard page votes: news by id, meme by url, else a fixed key.
+        """
+        news = (self.sections.get("news") or {}).get("data") or []
+        meme = self.sections.get("meme") or {}
+        options = [("prices", "prices_block"), ("ai_insight", "today_insight")]
+        if news:
+            n = rnd.choice(news)
+            options.append(("news", n.get("id") or n.get("title") or "0"))
+        if meme.get("url"):
+            options.append(("meme", meme["url"]))
+        if "chart" in self.sections:
+            options.append(("chart", "price_chart"))
+        if "fun" in self.sections:
+            options.append(("fun", "daily_fun"))
+        return rnd.choice(options)
+
+
+async def setup_user(client: httpx.AsyncClient, rec: Recorder, user: BenchUser, n: int):
+    r = await rec.call(client, "POST /auth/signup", "POST", "/auth/signup",
+                       json={"name": f"bench {n}", "email": user.email, "password": PASSWORD})
+    if r is not None and r.status_code == 200:
+        user.token = r.json()["access_token"]
+    else:
+        r = await rec.call(client, "POST /auth/login", "POST", "/auth/login",
+                           json={"email": user.email, "password": PASSWORD})
+        if r is None or r.status_code != 200:
+            raise SystemExit(f"could not sign up or log in {user.email}: {r.status_code if r else 'no response'}")
+        user.token = r.json()["access_token"]
+
+    await rec.call(client, "POST /onboarding", "POST", "/onboarding", json=user.prefs, headers=user.headers)
+    await load_dashboard(client, rec, user)
+
+
+async def load_dashboard(client: httpx.AsyncClient, rec: Recorder, user: BenchUser):
+    headers = dict(user.headers)
+    if user.etag:
+        headers["If-None-Match"] = user.etag
+    r = await rec.call(client, "GET /dashboard", "GET", "/dashboard", headers=headers)
+    if r is not None and r.status_code == 200:
+        body = r.json()
+        user.dashboard_id = body.get("dashboard_id")
+        user.sections = body.get("sections") or {}
+        user.etag = r.headers.get("etag")
+
+
+async def refresh(client: httpx.AsyncClient, rec: Recorder, user: BenchUser, rnd: random.Random):
+    section = rnd.choice([s for s in REFRESHABLE if s in user.sections] or ["prices"])
+    r = await rec.call(client, "POST /dashboard/refresh/{section}", "POST", f"/dashboard/refresh/{section}",
+                       headers=user.headers)
+    if r is not None and r.status_code == 200:
+        body = r.json()
+        if body.get("dashboard_id"):
+            user.dashboard_id = body["dashboard_id"]
+        user.sections = body.get("sections") or user.sections
+        user.etag = None
+
+
+async def vote(client: httpx.AsyncClient, rec: Recorder, user: BenchUser, rnd: random.Random):
+    if user.dashboard_id is None:
+        return await load_dashboard(client, rec, user)
+    section, item = user.vote_target(rnd)
+    await rec.call(client, "POST /votes", "POST", "/votes", headers=user.headers, json={
+        "dashboard_id": user.dashboard_id, "section": section, "item": item, "value": rnd.choice((1, -1)),
+    })
+
+
+def parse_mix(raw: str) -> list[tuple[str, float]]:
+    """
+    "dashboard=5,refresh=1,votes=3" -> [("dashboard", 5.0), ...]
+    """
+    mix = []
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("dashboard", "refresh", "votes"):
+            raise SystemExit(f"unknown operation {name!r} in --mix")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+async def amain(args) -> dict:
+    rnd = random.Random(args.seed)
+    users = [BenchUser(n, rnd) for n in range(args.users)]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    setup_rec, rec = Recorder(), Recorder()
+    mix = parse_mix(args.mix)
+    names, weights = [m[0] for m in mix], [m[1] for m in mix]
+
+    async with httpx.AsyncClient(base_url=args.api, timeout=args.timeout, limits=limits) as client:
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def guarded_setup(i, u):
+            async with sem:
+                await setup_user(client, setup_rec, u, i)
+
+        setup_started = time.perf_counter()
+        await asyncio.gather(*(guarded_setup(i, u) for i, u in enumerate(users)))
+        setup_elapsed = time.perf_counter() - setup_started
+
+        ops = {
+            "dashboard": lambda u, r: load_dashboard(client, rec, u),
+            "refresh": lambda u, r: refresh(client, rec, u, r),
+            "votes": lambda u, r: vote(client, rec, u, r),
+        }
+        deadline = time.perf_counter() + args.duration
+        issued = 0
+
+        async def worker(wid: int):
+            nonlocal issued
+            wrnd = random.Random(f"{args.seed}:{wid}")
+            while time.perf_counter() < deadline and (not args.requests or issued < args.requests):
+                issued += 1
+                op = wrnd.choices(names, weights=weights, k=1)[0]
+                await ops[op](wrnd.choice(users), wrnd)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "setup": {"users": len(users), "elapsed_s": round(setup_elapsed, 3), "endpoints": setup_rec.report(setup_elapsed)},
+        "run": {"elapsed_s": round(elapsed, 3), "endpoints": rec.report(elapsed)},
+    }
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    base_eps = baseline["results"]["run"]["endpoints"]
+    print(f"\nvs {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    for endpoint, cur in current["run"]["endpoints"].items():
+        base = base_eps.get(endpoint)
+        if not base:
+            print(f"  {endpoint}: no baseline")
+            continue
+        parts = []
+        for key in ("p50", "p95", "p99"):
+            b, c = base["latency_ms"][key], cur["latency_ms"][key]
+            parts.append(f"{key} {b}->{c}ms ({(c - b) / b * 100:+.0f}%)" if b else f"{key} {b}->{c}ms")
+        b, c = base["throughput_rps"], cur["throughput_rps"]
+        parts.append(f"rps {b}->{c}")
+        print(f"  {endpoint:<34} " + "  ".join(parts))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load after setup")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="dashboard=5,refresh=1,votes=3", help="operation weights")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    results = asyncio.run(amain(args))
+    print(f"setup: {results['setup']['users']} users in {results['setup']['elapsed_s']}s")
+    for endpoint, r in results["run"]["endpoints"].items():
+        print(
+            f"{endpoint:<34} {r['requests']:>6} req  {r['throughput_rps']:>7} req/s  "
+            f"p50={r['latency_ms']['p50']}ms p95={r['latency_ms']['p95']}ms p99={r['latency_ms']['p99']}ms  "
+            f"errors={r['errors']}"
+        )
+    if args.compare:
+        compare(results, args.compare)
+    write_results(args.out, "load", results, config=vars(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,199 @@
+"""
+Local stand-ins for the upstream APIs, for benchmarking without network access.
+
+    cd backend
+    python -m bench.upstream_stubs --port 9100 --latency-ms 40 --latency-ms openrouter=600 \\
+        --error-rate 0.01 --rate-limit coingecko=30
+
+Serves, under one port:
+    /coingecko/api/v3/simple/price, /coingecko/api/v3/coins/{id}/market_chart, /coingecko/api/v3/search
+    /cryptopanic/api/developer/v2/posts/
+    /openrouter/api/v1/chat/completions
+
+Point the API at it with (see bench/load.py):
+    COINGECKO_BASE_URL=http://127.0.0.1:9100/coingecko/api/v3
+    CRYPTOPANIC_BASE_URL=http://127.0.0.1:9100/cryptopanic/api/developer/v2
+    OPENROUTER_BASE_URL=http://127.0.0.1:9100/openrouter/api/v1
+    CRYPTOPANIC_TOKEN=stub OPENROUTER_API_KEY=stub
+
+Every option takes a default value and/or per-upstream overrides (name=value), repeatable:
+    --latency-ms / --jitter-ms   response delay (uniform jitter on top)
+    --error-rate                 fraction of requests answered with 500
+    --rate-limit                 requests/second before answering 429 with Retry-After (0 = unlimited)
+Counters are served at /_stats.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+UPSTREAMS = ("coingecko", "cryptopanic", "openrouter")
+
+HEADLINES = [
+    "Bitcoin price holds above key level as market cools",
+    "Ethereum developers schedule next network upgrade",
+    "SEC delays decision on spot ETF applications",
+    "DeFi protocol exploit drains liquidity pool",
+    "Solana activity surges on memecoin trading",
+    "Court ruling clears path for exchange relaunch",
+    "Stablecoin supply rises for third straight week",
+    "Market drop wipes out leveraged longs",
+    "Regulation talks stall as lawmakers disagree on crypto bill",
+    "Major exchange reports security breach, withdrawals paused",
+]
+
+
+class UpstreamBehaviour:
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float, rate_limit: float):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.tokens = rate_limit
+        self.refilled_at = time.monotonic()
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    def take_token(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled_at) * self.rate_limit)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def respond(self, body_fn):
+        self.counts["requests"] += 1
+        if not self.take_token():
+            self.counts["rate_limited"] += 1
+            retry_after = max(1, int(1 / self.rate_limit + 0.999))
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": str(retry_after)})
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < self.error_rate:
+            self.counts["errors"] += 1
+            return JSONResponse({"error": "stub failure"}, status_code=500)
+        self.counts["ok"] += 1
+        return JSONResponse(body_fn())
+
+
+def coin_price(coin_id: str) -> dict:
+    rnd = random.Random(coin_id)
+    base = rnd.uniform(0.05, 70000)
+    return {"usd": round(base * random.uniform(0.99, 1.01), 6), "usd_24h_change": round(random.uniform(-8, 8), 3)}
+
+
+def market_chart(coin_id: str, days: int) -> dict:
+    rnd = random.Random(f"{coin_id}:{days}")
+    price = rnd.uniform(0.05, 70000)
+    now_ms = int(time.time() * 1000)
+    points = max(2, int(days) * 24)  # hourly, like CoinGecko for 2-90 days
+    step = int(days) * 86400_000 // points
+    prices = []
+    for i in range(points):
+        price *= 1 + rnd.gauss(0, 0.01)
+        prices.append([now_ms - (points - i) * step, round(price, 6)])
+    return {"prices": prices, "market_caps": [], "total_volumes": []}
+
+
+def news_posts() -> dict:
+    today = time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime())
+    return {"results": [
+        {"title": title, "description": f"{title}. Stub article body.", "published_at": today}
+        for title in HEADLINES
+    ]}
+
+
+def chat_completion(model: str) -> dict:
+    text = (
+        f"Today the market is sideways with medium volatility; long term investors can keep "
+        f"accumulating gradually and avoid leverage. (stub: {model})"
+    )
+    return {"model": model, "choices": [{"message": {"role": "assistant", "content": text}}]}
+
+
+def build_app(behaviour: dict[str, UpstreamBehaviour]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/coingecko/api/v3/simple/price")
+    async def simple_price(ids: str = "", vs_currencies: str = "usd"):
+        wanted = [i for i in ids.split(",") if i]
+        return await behaviour["coingecko"].respond(lambda: {i: coin_price(i) for i in wanted})
+
+    @app.get("/coingecko/api/v3/coins/{coin_id}/market_chart")
+    async def coin_market_chart(coin_id: str, vs_currency: str = "usd", days: int = 7):
+        return await behaviour["coingecko"].respond(lambda: market_chart(coin_id, days))
+
+    @app.get("/coingecko/api/v3/search")
+    async def search(query: str = ""):
+        q = query.strip().lower()
+        return await behaviour["coingecko"].respond(
+            lambda: {"coins": [{"id": q, "name": q.title(), "symbol": q[:4]}] if q else []}
+        )
+
+    @app.get("/cryptopanic/api/developer/v2/posts/")
+    async def posts():
+        return await behaviour["cryptopanic"].respond(news_posts)
+
+    @app.post("/openrouter/api/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        return await behaviour["openrouter"].respond(lambda: chat_completion(body.get("model") or ""))
+
+    @app.get("/_stats")
+    def stats():
+        return {name: b.counts for name, b in behaviour.items()}
+
+    return app
+
+
+def per_upstream(values: list[str] | None, default: float) -> dict[str, float]:
+    """
+    ["40", "openrouter=600"] -> {"coingecko": 40, "cryptopanic": 40, "openrouter": 600}
+    """
+    overrides = {}
+    for v in values or []:
+        if "=" in v:
+            name, _, value = v.partition("=")
+            if name not in UPSTREAMS:
+                raise SystemExit(f"unknown upstream {name!r} (expected one of {', '.join(UPSTREAMS)})")
+            overrides[name] = float(value)
+        else:
+            default = float(v)
+    return {name: overrides.get(name, default) for name in UPSTREAMS}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", action="append")
+    parser.add_argument("--jitter-ms", action="append")
+    parser.add_argument("--error-rate", action="append")
+    parser.add_argument("--rate-limit", action="append")
+    args = parser.parse_args()
+
+    latency = per_upstream(args.latency_ms, 30)
+    jitter = per_upstream(args.jitter_ms, 20)
+    errors = per_upstream(args.error_rate, 0)
+    limits = per_upstream(args.rate_limit, 0)
+    behaviour = {
+        name: UpstreamBehaviour(latency[name], jitter[name], errors[name], limits[name])
+        for name in UPSTREAMS
+    }
+    uvicorn.run(build_app(behaviour), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,183 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL.
+    Expired entries are dropped on read; the least recently used entry is evicted once maxsize is hit.
+
+    stale_ttl keeps expired entries around that much longer as last-known-good values:
+    get() ignores them, get_stale() still returns them (stale-while-revalidate, outage fallback).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, stored_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            if entry[0] <= now:
+                if entry[0] + self.stale_ttl <= now:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def get_stale(self, key):
+        """
+        Returns (value, age_seconds, fresh) for an entry within ttl + stale_ttl, or None.
+        Counts fresh entries as hits and expired ones as misses (and stale hits).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] + self.stale_ttl <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            fresh = entry[0] > now
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.stale_hits += 1
+            return entry[2], now - entry[1], fresh
+
+    def get_with_age(self, key, stale: bool = False):
+        """
+        Returns (value, age_seconds) or None; does not touch hit/miss counters.
+        stale=True also returns expired entries still within stale_ttl.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] + (self.stale_ttl if stale else 0) <= now:
+                return None
+            return entry[2], now - entry[1]
+
+    def ages(self) -> dict:
+        """
+        {key: age_seconds} for every live or last-known-good entry (staleness report).
+        """
+        now = time.time()
+        with self._lock:
+            return {k: round(now - e[1], 1) for k, e in self._data.items() if e[0] + self.stale_ttl > now}
+
+    def set(self, key, value, ttl: float | None = None):
+        now = time.time()
+        with self._lock:
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get_with_age(key) is not None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight task.
+    Keys are tuples whose first element names the resource kind (used for counters).
+    Every waiter gets the shared result or the shared exception.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self._counts: dict[str, dict] = {}
+
+    def _count(self, key, field: str):
+        kind = key[0] if isinstance(key, tuple) and key else str(key)
+        c = self._counts.setdefault(kind, {"calls": 0, "coalesced": 0})
+        c[field] += 1
+
+    async def do(self, key, fn):
+        """
+        fn is a zero-arg callable returning an awaitable; it only runs if no call for key is in flight.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(key, "coalesced")
+        else:
+            self._count(key, "calls")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+
+        # shield: a cancelled waiter (e.g. section deadline) must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def spawn(self, key, fn) -> bool:
+        """
+        Starts fn in the background unless a call for key is already in flight; nobody awaits it.
+        Failures are swallowed (see _forget). Returns whether a new call was started.
+        """
+        if key in self._inflight:
+            return False
+        self._count(key, "calls")
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        return True
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved so an unawaited failure isn't logged as "never retrieved"
+
+    def stats(self) -> dict:
+        out = {}
+        for kind, c in self._counts.items():
+            total = c["calls"] + c["coalesced"]
+            out[kind] = {**c, "coalesce_ratio": round(c["coalesced"] / total, 3) if total else None}
+        out["in_flight"] = len(self._inflight)
+        return out
@@ -0,0 +1,132 @@
+import os
+import time
+
+from dotenv import load_dotenv
+
+from logs import get_logger
+from metrics import Counter, Gauge
+
+load_dotenv()
+log = get_logger("circuit")
+
+# Per-upstream circuit breakers. Failures are 5xx responses, timeouts and connection errors;
+# 4xx (and 429s, which the scheduler handles) count as the upstream being up.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # consecutive failures
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_OPEN_MAX = float(os.getenv("CIRCUIT_OPEN_MAX", "300"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_OPENED = Counter("upstream_circuit_opened_total", "Times an upstream circuit opened", ("upstream",))
+CIRCUIT_SHORT_CIRCUITED = Counter(
+    "upstream_circuit_rejected_total", "Upstream calls failed fast by an open circuit", ("upstream",),
+)
+
+
+class CircuitOpen(Exception):
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} unavailable (circuit open, retry in {retry_after:.0f}s)")
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; calls then fail immediately.
+    After `open_seconds` the circuit is half-open and lets a single probe through: success
+    closes it, failure re-opens it with the open period doubled (up to `open_max`).
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS, open_max: float = CIRCUIT_OPEN_MAX):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.open_max = max(open_seconds, open_max)
+        self.state = CLOSED
+        self.failures = 0
+        self.open_for = open_seconds
+        self.opened_until = 0.0
+        self.probing = False
+        self.counts = {"opened": 0, "rejected": 0}
+
+    def before_call(self):
+        """
+        Raises CircuitOpen if the call must not go out.
+        """
+        if self.state == OPEN:
+            remaining = self.opened_until - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN:
+            if self.probing:  # one probe at a time
+                self._reject(self.open_seconds)
+            self.probing = True
+
+    def _reject(self, retry_after: float):
+        self.counts["rejected"] += 1
+        CIRCUIT_SHORT_CIRCUITED.inc(upstream=self.name)
+        raise CircuitOpen(self.name, retry_after)
+
+    def record_success(self):
+        if self.state != CLOSED:
+            log.info("circuit closed", extra={"upstream": self.name})
+        self.state = CLOSED
+        self.failures = 0
+        self.open_for = self.open_seconds
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.open_for = min(self.open_max, self.open_for * 2)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """
+        The call ended without telling us anything (cancelled, rate-limited): free the probe slot.
+        """
+        self.probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self.probing = False
+        self.opened_until = time.monotonic() + self.open_for
+        self.counts["opened"] += 1
+        CIRCUIT_OPENED.inc(upstream=self.name)
+        log.warning("circuit opened", extra={"upstream": self.name, "failures": self.failures, "open_s": self.open_for})
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "state": self.state,
+            "failures": self.failures,
+            "open_for_s": self.open_for,
+            "retry_in_s": round(max(0.0, self.opened_until - time.monotonic()), 1) if self.state == OPEN else 0.0,
+        }
+
+
+BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = BREAKERS.get(name)
+    if breaker is None:
+        breaker = BREAKERS[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_stats() -> dict:
+    return {name: b.stats() for name, b in BREAKERS.items()}
+
+
+Gauge(
+    "upstream_circuit_state", "Upstream circuit state (0 closed, 1 half-open, 2 open)",
+    lambda: {(name,): _STATE_VALUES[b.state] for name, b in BREAKERS.items()},
+    ("upstream",),
+)
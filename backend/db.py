@@ -1,12 +1,85 @@
 import os
+import re
+import time
+from functools import lru_cache
+
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from metrics import Histogram
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
 engine = create_engine(DATABASE_URL, future=True)
 
+
+def _async_database_url(url: str) -> str:
+    """
+    postgresql://... / postgresql+psycopg2://... -> postgresql+asyncpg://...
+    """
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        scheme = scheme.split("+", 1)[0]
+    if scheme == "postgres":
+        scheme = "postgresql"
+    return f"{scheme}+asyncpg{sep}{rest}"
+
+
+# Async engine for the async endpoints: queries don't block the event loop.
+# Sync `engine` stays for schema init, the threadpool (sync) endpoints and scripts.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Database statement execution time", ("engine", "op", "table"),
+)
+_WRITE_TARGET = re.compile(r"\b(?:insert\s+into|update|delete\s+from)\s+([a-z_][a-z0-9_]*)")
+_READ_SOURCE = re.compile(r"\bfrom\s+([a-z_][a-z0-9_]*)")
+
+
+@lru_cache(maxsize=512)
+def statement_label(statement: str) -> tuple[str, str]:
+    """
+    (op, table) for a SQL statement: "SELECT ... FROM users ..." -> ("select", "users").
+    CTE statements are labeled by the table they write, if any.
+    """
+    sql = statement.lstrip().lower()
+    op = sql.split(None, 1)[0] if sql else ""
+    m = _WRITE_TARGET.search(sql)
+    if m and op in ("with", "insert", "update", "delete"):
+        return ("insert" if "insert" in m.group(0) else m.group(0).split()[0]), m.group(1)
+    for table in _READ_SOURCE.findall(sql):
+        if table not in ("unnest", "lateral"):
+            return op, table
+    return op, ""
+
+
+def _instrument(sync_engine, label: str):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            op, table = statement_label(statement)
+            DB_QUERY_LATENCY.observe(time.perf_counter() - started, engine=label, op=op, table=table)
+
+
+_instrument(engine, "sync")
+_instrument(async_engine.sync_engine, "async")
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SCHEMA_PATH = os.path.join(BASE_DIR, "schema.sql")
 
@@ -0,0 +1,105 @@
+import itertools
+
+from sqlalchemy import text
+
+# How much votes can move a ranking (on top of the preference-based scores):
+#   affinity bonus = sum of the user's affinity for the item's tags/keywords, capped at +-3
+#   popularity bonus = item net score across all users / 5 (truncated), capped at +-2
+AFFINITY_CAP = 3
+POPULARITY_STEP = 5
+POPULARITY_CAP = 2
+NEWS_SCORE_WINDOW_DAYS = 7  # news items older than this no longer show up in the feed
+
+
+def _clamp(value: int, cap: int) -> int:
+    return max(-cap, min(cap, value))
+
+
+def popularity_bonus(score: int) -> int:
+    return _clamp(int(score / POPULARITY_STEP), POPULARITY_CAP)
+
+
+class ItemScores:
+    """
+    Net scores of voted items across all users ({section: {item: score}}, from vote_item_scores).
+    Hashable by load version, so tables built from one load (per-profile meme tables) can be cached.
+    """
+
+    __slots__ = ("scores", "version")
+
+    def __init__(self, scores: dict, version: int):
+        self.scores = scores
+        self.version = version
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def __eq__(self, other):
+        return isinstance(other, ItemScores) and other.version == self.version
+
+    def get(self, section: str, default=None):
+        return self.scores.get(section, default)
+
+    def bonus(self, section: str, item: str) -> int:
+        return popularity_bonus(self.scores.get(section, {}).get(item, 0))
+
+
+_ITEM_SCORE_VERSIONS = itertools.count(1)
+
+
+class Feedback:
+    """
+    Vote-derived ranking signals for one user: their own affinities
+    ({kind: {key: score}}, from user_affinity) and the shared ItemScores.
+    """
+
+    __slots__ = ("user_id", "affinity", "items")
+
+    def __init__(self, user_id: int, affinity: dict, items: ItemScores):
+        self.user_id = user_id
+        self.affinity = affinity
+        self.items = items
+
+    def section(self, name: str) -> int:
+        return self.affinity.get("section", {}).get(name, 0)
+
+    def affinity_bonus(self, kind: str, keys) -> int:
+        scores = self.affinity.get(kind)
+        if not scores:
+            return 0
+        return _clamp(sum(scores.get(k, 0) for k in keys), AFFINITY_CAP)
+
+    def item_bonus(self, section: str, item: str) -> int:
+        return self.items.bonus(section, item)
+
+
+async def load_user_affinity(conn, user_id: int) -> dict[str, dict[str, int]]:
+    """
+    One primary-key range scan on user_affinity.
+    """
+    q = text("""
+        SELECT kind, key, score
+        FROM user_affinity
+        WHERE user_id = :user_id AND score <> 0
+    """)
+    out: dict[str, dict[str, int]] = {}
+    for kind, key, score in (await conn.execute(q, {"user_id": user_id})).fetchall():
+        out.setdefault(kind, {})[key] = int(score)
+    return out
+
+
+async def load_item_scores(conn) -> ItemScores:
+    """
+    Net scores of every voted meme and of recent news items (shared by all users).
+    """
+    q = text("""
+        SELECT section, item, score
+        FROM vote_item_scores
+        WHERE score <> 0
+          AND (section = 'meme'
+               OR (section = 'news' AND updated_at > now() - make_interval(days => :news_days)))
+    """)
+    out: dict[str, dict[str, int]] = {}
+    for section, item, score in (await conn.execute(q, {"news_days": NEWS_SCORE_WINDOW_DAYS})).fetchall():
+        out.setdefault(section, {})[item] = int(score)
+    return ItemScores(out, next(_ITEM_SCORE_VERSIONS))
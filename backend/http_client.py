@@ -0,0 +1,184 @@
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+
+from logs import get_logger
+from metrics import Counter, Histogram
+
+load_dotenv()
+log = get_logger("http")
+
+# One pooled AsyncClient per upstream host, created on app startup and closed on shutdown.
+# Separate clients give each host its own connection limits and default timeout.
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Rate limits (requests per minute, burst) default to the plans in use: CoinGecko demo
+# (30/min) or pro (500/min) following COINGECKO_MODE, CryptoPanic developer, OpenRouter free
+# models (20/min). Set *_RATE_PER_MIN=0 to disable limiting for an upstream.
+COINGECKO_PLAN_RATES = {"demo": 30, "pro": 500}
+_COINGECKO_MODE = os.getenv("COINGECKO_MODE", "demo").lower()
+
+UPSTREAMS = {
+    "coingecko": {
+        "timeout": float(os.getenv("COINGECKO_TIMEOUT", "12")),
+        "max_connections": int(os.getenv("COINGECKO_MAX_CONNECTIONS", "20")),
+        "rate_per_min": float(os.getenv("COINGECKO_RATE_PER_MIN", COINGECKO_PLAN_RATES.get(_COINGECKO_MODE, 30))),
+        "burst": int(os.getenv("COINGECKO_BURST", "5")),
+    },
+    "cryptopanic": {
+        "timeout": float(os.getenv("CRYPTOPANIC_TIMEOUT", "15")),
+        "max_connections": int(os.getenv("CRYPTOPANIC_MAX_CONNECTIONS", "10")),
+        "rate_per_min": float(os.getenv("CRYPTOPANIC_RATE_PER_MIN", "60")),
+        "burst": int(os.getenv("CRYPTOPANIC_BURST", "2")),
+    },
+    "openrouter": {
+        "timeout": float(os.getenv("OPENROUTER_TIMEOUT", "25")),
+        "max_connections": int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "20")),
+        "rate_per_min": float(os.getenv("OPENROUTER_RATE_PER_MIN", "20")),
+        "burst": int(os.getenv("OPENROUTER_BURST", "3")),
+    },
+}
+
+# 429 handling (upstream_scheduler.py): retries per call, backoff when Retry-After is missing,
+# and how long each priority lane (interactive, refresh, background) may wait for a slot.
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "1"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "60"))
+LANE_MAX_WAIT = (
+    float(os.getenv("UPSTREAM_WAIT_INTERACTIVE", "4")),
+    float(os.getenv("UPSTREAM_WAIT_REFRESH", "10")),
+    float(os.getenv("UPSTREAM_WAIT_BACKGROUND", "120")),
+)
+
+_CLIENTS: dict[str, httpx.AsyncClient] = {}
+POOL_STATS = {name: {"requests": 0, "new_connections": 0} for name in UPSTREAMS}
+
+# endpoint: which API of the upstream; model: the OpenRouter model (passed by the caller as
+# extensions={"model": ...}), empty for the others
+UPSTREAM_LABELS = ("upstream", "endpoint", "model")
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Time until upstream response headers", UPSTREAM_LABELS,
+)
+UPSTREAM_RESPONSES = Counter(
+    "upstream_responses_total", "Upstream responses by status code", UPSTREAM_LABELS + ("status",),
+)
+UPSTREAM_RATE_LIMITED = Counter(
+    "upstream_rate_limited_total", "Upstream 429 responses", UPSTREAM_LABELS,
+)
+
+
+def endpoint_label(name: str, path: str) -> str:
+    """
+    Low-cardinality name for an upstream URL path.
+    """
+    if name == "coingecko":
+        if path.endswith("/simple/price"):
+            return "price"
+        if path.endswith("/market_chart"):
+            return "chart"
+        if path.endswith("/search"):
+            return "search"
+    elif name == "cryptopanic" and "/posts" in path:
+        return "posts"
+    elif name == "openrouter" and path.endswith("/chat/completions"):
+        return "chat"
+    return "other"
+
+
+def _http2_available() -> bool:
+    """
+    HTTP/2 needs the optional `h2` package (pip install httpx[http2]).
+    """
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        log.warning("HTTP2_ENABLED=true but 'h2' is not installed; using HTTP/1.1")
+        return False
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    cfg = UPSTREAMS[name]
+    stats = POOL_STATS[name]
+    http2 = _http2_available()
+    stats["http2"] = http2
+
+    async def trace(event: str, info: dict):
+        # Emitted by httpcore only when the pool has to open a new TCP connection
+        if event == "connection.connect_tcp.started":
+            stats["new_connections"] += 1
+
+    async def on_request(request: httpx.Request):
+        stats["requests"] += 1
+        request.extensions["trace"] = trace
+        request.extensions["started"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response):
+        request = response.request
+        labels = {
+            "upstream": name,
+            "endpoint": endpoint_label(name, request.url.path),
+            "model": request.extensions.get("model", ""),
+        }
+        started = request.extensions.get("started")
+        if started is not None:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, **labels)
+        UPSTREAM_RESPONSES.inc(status=response.status_code, **labels)
+        if response.status_code == 429:
+            UPSTREAM_RATE_LIMITED.inc(**labels)
+
+    return httpx.AsyncClient(
+        timeout=cfg["timeout"],
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_connections"],
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        event_hooks={"request": [on_request], "response": [on_response]},
+    )
+
+
+def start_http_clients():
+    for name in UPSTREAMS:
+        if name not in _CLIENTS:
+            _CLIENTS[name] = _build_client(name)
+
+
+async def close_http_clients():
+    clients = list(_CLIENTS.values())
+    _CLIENTS.clear()
+    for c in clients:
+        await c.aclose()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    Shared client for an upstream ("coingecko", "cryptopanic", "openrouter").
+    Created lazily if used outside the app lifecycle (scripts, REPL).
+    """
+    client = _CLIENTS.get(name)
+    if client is None:
+        client = _CLIENTS[name] = _build_client(name)
+    return client
+
+
+def pool_stats() -> dict:
+    """
+    Connection reuse counters per upstream; reused = requests that did not open a new connection.
+    """
+    out = {}
+    for name, s in POOL_STATS.items():
+        reused = max(0, s["requests"] - s["new_connections"])
+        out[name] = {
+            "requests": s["requests"],
+            "new_connections": s["new_connections"],
+            "reused": reused,
+            "reuse_ratio": round(reused / s["requests"], 3) if s["requests"] else None,
+            "http2": s.get("http2", False),
+        }
+    return out
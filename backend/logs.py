@@ -0,0 +1,86 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LOG_LEVEL: DEBUG / INFO / WARNING / ERROR, or OFF to silence the app loggers entirely.
+# LOG_FORMAT: "json" (one object per line) or "text" (message followed by key=value pairs).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+        line = f"{ts} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_LISTENER: logging.handlers.QueueListener | None = None
+
+
+def setup_logging():
+    """
+    Configures the "app" logger tree. Records are handed to a queue and written to stderr
+    by a listener thread, so request handlers never block on the stream write.
+    """
+    global _LISTENER
+    root = logging.getLogger("app")
+    if _LISTENER is not None:
+        return root
+
+    root.propagate = False
+    if LOG_LEVEL == "OFF":
+        root.setLevel(logging.CRITICAL + 1)
+        return root
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(q))
+    _LISTENER = logging.handlers.QueueListener(q, stream, respect_handler_level=False)
+    _LISTENER.start()
+    atexit.register(_LISTENER.stop)
+    return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    get_logger("dashboard") -> the "app.dashboard" logger.
+    """
+    setup_logging()
+    return logging.getLogger(f"app.{name}")
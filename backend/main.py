@@ -1,26 +1,75 @@
 import os
 import re
 import json
+import asyncio
+import math
 import random
+import hmac
 import hashlib
+import logging
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timedelta, date
 import time
 
 import jwt
-import bcrypt
-import httpx
 from dotenv import load_dotenv
 from sqlalchemy import text
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from db import init_db, engine
-
-PRICE_CACHE = {}  # key -> (ts, data)
+from db import init_db, engine, async_engine
+from cache import TTLCache, SingleFlight
+from memes import MemeIndex, profile_key, read_catalog
+from votes import VoteBuffer, upsert_votes, collapse_votes
+from feedback import Feedback, load_user_affinity, load_item_scores
+from passwords import PasswordHasherBusy, hash_password, verify_password, needs_rehash, hasher_stats
+from http_client import start_http_clients, close_http_clients, get_client, pool_stats
+from upstream_scheduler import REFRESH, BACKGROUND, scheduled, upstream_lane, scheduler_stats
+from circuit import breaker_stats
+from admission import BUILD_ADMISSION, REFRESH_LIMITER, Overloaded, admission_stats
+from logs import get_logger
+import metrics
+from metrics import Counter, Histogram, Gauge
+
+log = get_logger("api")
+
+# *_STALE_TTL: how long past its TTL an entry is kept as last-known-good. Stale values are
+# served immediately and refreshed in the background, and stand in when the upstream fails.
 PRICE_TTL = 60
+PRICE_STALE_TTL = int(os.getenv("PRICE_STALE_TTL", "21600"))
+PRICE_CACHE = TTLCache(  # coin id -> price row
+    maxsize=int(os.getenv("PRICE_CACHE_MAX", "5000")), ttl=PRICE_TTL, stale_ttl=PRICE_STALE_TTL,
+)
+CHART_TTL = int(os.getenv("CHART_TTL", "900"))
+CHART_STALE_TTL = int(os.getenv("CHART_STALE_TTL", "86400"))
+CHART_CACHE = TTLCache(  # (coin id, days) -> series
+    maxsize=int(os.getenv("CHART_CACHE_MAX", "2000")), ttl=CHART_TTL, stale_ttl=CHART_STALE_TTL,
+)
+CHART_MISS_TTL = int(os.getenv("CHART_MISS_TTL", "300"))
+CHART_MISSES = TTLCache(maxsize=2000, ttl=CHART_MISS_TTL)  # (coin id, days) -> definitive failure
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "96"))  # per series, after LTTB downsampling
+UPSTREAM_FLIGHTS = SingleFlight()  # identical in-flight upstream GETs share one response
+
+
+def revalidate(key: tuple, fn):
+    """
+    Refreshes a stale cache entry behind the response: fn runs at most once per key at a time,
+    in the background upstream lane. Failures leave the last-known-good value in place.
+    """
+    with upstream_lane(BACKGROUND):
+        UPSTREAM_FLIGHTS.spawn(key, fn)
+
+
+# (user_id, day) -> (dashboard_id, serialized GET /dashboard body, etag). Invalidated on every
+# snapshot write in this worker; the TTL bounds staleness from writes on other workers.
+SNAPSHOT_CACHE = TTLCache(
+    maxsize=int(os.getenv("SNAPSHOT_CACHE_MAX", "10000")),
+    ttl=int(os.getenv("SNAPSHOT_CACHE_TTL", "120")),
+)
 
 # =========================================================
 # App bootstrapping
@@ -32,7 +81,89 @@ bearer = HTTPBearer()
 
 DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"
 MEMES_FILE = os.getenv("MEMES_FILE", str(Path(__file__).with_name("memes.json")))
-MEME_CATALOG: list[dict] = []
+MEME_INDEX = MemeIndex([])  # swapped whole on (re)load; readers never see a half-built index
+MEMES_RELOAD_INTERVAL = float(os.getenv("MEMES_RELOAD_INTERVAL", "30"))  # mtime poll, seconds; 0 disables
+MEMES_STATUS = {"mtime": None, "loaded_at": None, "reloads": 0, "errors": 0}
+
+# JWT settings are read once; get_user_id runs on every authenticated request
+JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# /stats, /stats/market-store and /metrics expose per-user and per-coin state: they need
+# Authorization: Bearer <OPS_TOKEN> (Prometheus: `authorization: {credentials: ...}`), and are
+# refused while OPS_TOKEN is unset.
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")
+# sha256(token) -> (user_id, exp). Entries live until the token's own expiry,
+# so a polling client's token is signature-checked once, not on every request.
+TOKEN_CACHE = TTLCache(maxsize=int(os.getenv("TOKEN_CACHE_MAX", "10000")), ttl=3600)
+
+# Cold dashboard build deadlines (seconds). Sections run concurrently; any section still
+# running after its timeout (or when the whole budget is spent) is returned as "pending".
+DASHBOARD_BUILD_BUDGET = float(os.getenv("DASHBOARD_BUILD_BUDGET", "25"))
+DASHBOARD_SECTION_TIMEOUT = float(os.getenv("DASHBOARD_SECTION_TIMEOUT", "20"))
+# Pending or failed sections are not persisted with the snapshot: a background task retries them
+# with a longer deadline and adds them to it, at most once per PENDING_RETRY_INTERVAL per user/day.
+# Definitive failures ("final": true, e.g. unknown coin ids) are persisted as they are, and a section
+# still failing after PENDING_MAX_ATTEMPTS retries is persisted with its last error.
+PENDING_SECTION_TIMEOUT = float(os.getenv("PENDING_SECTION_TIMEOUT", "90"))
+PENDING_RETRY_INTERVAL = int(os.getenv("PENDING_RETRY_INTERVAL", "60"))
+PENDING_MAX_ATTEMPTS = int(os.getenv("PENDING_MAX_ATTEMPTS", "3"))
+SECTION_COMPLETIONS = TTLCache(maxsize=10000, ttl=PENDING_RETRY_INTERVAL)  # (user_id, day) -> last attempt
+SECTION_ATTEMPTS = TTLCache(maxsize=10000, ttl=86400)  # (dashboard_id, section) -> failed retries
+COMPLETION_TASKS: dict[tuple, asyncio.Task] = {}
+
+# Background market data ingestion (prices for every tracked coin, charts for chart users).
+# One worker ingests at a time (Postgres advisory lock, held while it runs); the others fetch on demand.
+MARKET_INGEST_ENABLED = os.getenv("MARKET_INGEST_ENABLED", "true").lower() == "true" and not DEV_MODE
+MARKET_INGEST_INTERVAL = float(os.getenv("MARKET_INGEST_INTERVAL", "45"))
+MARKET_CHART_INGEST_INTERVAL = float(os.getenv("MARKET_CHART_INGEST_INTERVAL", "600"))
+MARKET_INGEST_BATCH = int(os.getenv("MARKET_INGEST_BATCH", "250"))  # ids per /simple/price call
+MARKET_INGEST_LOCK_KEY = 0x696e6765  # pg advisory lock id
+BACKGROUND_TASKS: list[asyncio.Task] = []
+
+# Cohort templates: users with the same (investor_type, content types, assets) share the
+# cohort sections (prices, chart, AI insight) of a cold build, per UTC day. Prices move intraday,
+# so a template is rebuilt at most every COHORT_TTL seconds (86400: hold it for the whole day).
+COHORT_TTL = int(os.getenv("COHORT_TTL", "900"))
+COHORT_CACHE = TTLCache(maxsize=int(os.getenv("COHORT_CACHE_MAX", "5000")), ttl=COHORT_TTL)  # (cohort, day) -> {name: section}
+COHORT_SECTIONS = ("prices", "chart", "ai_insight")
+
+# Next-day prewarming: PREWARM_LEAD_S before the UTC rollover the shared inputs (prices,
+# charts, news) of recently active users are fetched; from the rollover on, their snapshots
+# for the new day are built and persisted, PREWARM_CONCURRENCY at a time, until
+# PREWARM_WINDOW_S after it. One worker does the run (Postgres advisory lock).
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true" and not DEV_MODE
+PREWARM_LEAD_S = float(os.getenv("PREWARM_LEAD_S", "300"))
+PREWARM_WINDOW_S = float(os.getenv("PREWARM_WINDOW_S", "900"))
+PREWARM_ACTIVE_DAYS = int(os.getenv("PREWARM_ACTIVE_DAYS", "3"))  # a snapshot in the last N days
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "8"))
+PREWARM_MAX_USERS = int(os.getenv("PREWARM_MAX_USERS", "10000"))
+PREWARM_LOCK_KEY = 0x70726577  # pg advisory lock id
+
+# Write-behind votes: POST /votes only buffers; a flusher writes the buffer in one upsert
+# every VOTE_FLUSH_INTERVAL_MS or once VOTE_FLUSH_MAX_ROWS distinct votes are waiting.
+VOTE_WRITE_BEHIND = os.getenv("VOTE_WRITE_BEHIND", "false").lower() == "true"
+VOTE_FLUSH_INTERVAL_MS = int(os.getenv("VOTE_FLUSH_INTERVAL_MS", "250"))
+VOTE_FLUSH_MAX_ROWS = int(os.getenv("VOTE_FLUSH_MAX_ROWS", "500"))
+# Buffer cap: past it (e.g. while the DB is down and flushes keep failing) votes are written
+# synchronously, and answered with 503 if that fails too.
+VOTE_BUFFER_MAX = int(os.getenv("VOTE_BUFFER_MAX", "20000"))
+VOTE_BATCH_MAX = int(os.getenv("VOTE_BATCH_MAX", "100"))  # votes per POST /votes/batch
+
+# Vote feedback for ranking (user_affinity / vote_item_scores): per-user affinities are cached
+# for FEEDBACK_TTL and dropped as soon as that user's votes are written by this worker.
+FEEDBACK_TTL = int(os.getenv("FEEDBACK_TTL", "300"))
+FEEDBACK_CACHE = TTLCache(maxsize=int(os.getenv("FEEDBACK_CACHE_MAX", "10000")), ttl=FEEDBACK_TTL)
+ITEM_SCORES_CACHE = TTLCache(maxsize=1, ttl=int(os.getenv("ITEM_SCORES_TTL", "60")))
+
+
+def forget_feedback(user_ids):
+    for uid in user_ids:
+        FEEDBACK_CACHE.pop(uid)
+
+
+VOTE_BUFFER = VoteBuffer(
+    async_engine, VOTE_FLUSH_INTERVAL_MS / 1000, VOTE_FLUSH_MAX_ROWS, VOTE_BUFFER_MAX, on_flush=forget_feedback,
+)
 
 # Allowed sets (kept at module-level so it's consistent across endpoints)
 ALLOWED_INVESTOR_TYPES = {"long_term", "short_term", "nft_collector", "swing_trader", "defi_yield"}
@@ -56,12 +187,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# =========================================================
+# Metrics (GET /metrics, Prometheus text format)
+# =========================================================
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "API request latency (until response headers)", ("method", "route", "status"),
+)
+DASHBOARD_LOADS = Counter(
+    "dashboard_loads_total", "Dashboard loads by where the sections came from (cache, snapshot, rebuild, fallback)",
+    ("endpoint", "source"),
+)
+COHORT_SECTIONS_SERVED = Counter(
+    "dashboard_cohort_sections_total", "Cohort sections of cold builds, by source (template or built)",
+    ("section", "source"),
+)
+DASHBOARD_PREWARMS = Counter(
+    "dashboard_prewarm_total", "Next-day snapshots by prewarm outcome (prewarmed, exists, incomplete, failed, deferred)",
+    ("outcome",),
+)
+SECTION_LATENCY = Histogram(
+    "dashboard_section_duration_seconds", "Cold-build time per section", ("section", "outcome"),
+)
+
+
+def _cache_metric(attr: str) -> dict:
+    caches = {
+        "price": PRICE_CACHE, "chart": CHART_CACHE, "news": NEWS_CACHE, "insight": INSIGHT_CACHE,
+        "snapshot": SNAPSHOT_CACHE, "token": TOKEN_CACHE, "feedback": FEEDBACK_CACHE, "cohort": COHORT_CACHE,
+    }
+    return {(name,): getattr(c, attr) if attr != "size" else len(c) for name, c in caches.items()}
+
+
+Gauge("cache_hits_total", "In-process cache hits", lambda: _cache_metric("hits"), ("cache",), kind="counter")
+Gauge("cache_misses_total", "In-process cache misses", lambda: _cache_metric("misses"), ("cache",), kind="counter")
+Gauge(
+    "cache_stale_hits_total", "Expired entries served as last-known-good", lambda: _cache_metric("stale_hits"),
+    ("cache",), kind="counter",
+)
+Gauge("cache_entries", "In-process cache size", lambda: _cache_metric("size"), ("cache",))
+Gauge("dashboard_cohorts", "Cohort templates held for the current period", lambda: len(COHORT_CACHE.ages()))
+Gauge("votes_buffered", "Votes waiting for the write-behind flush", lambda: len(VOTE_BUFFER))
+Gauge("password_hash_waiting", "Password hash jobs waiting for a worker", lambda: hasher_stats()["waiting"])
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request Request/Response wrapping): observes the time
+    until response headers, labeled by the matched route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int):
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+        async def send_observed(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        except Exception:
+            if not observed:
+                observe(500)
+            raise
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     # Initializes DB schema (your init_db uses schema.sql)
     init_db()
     load_meme_catalog()
+    start_http_clients()
+    if MARKET_INGEST_ENABLED:
+        BACKGROUND_TASKS.append(asyncio.create_task(market_ingest_loop()))
+    if MEMES_RELOAD_INTERVAL > 0:
+        BACKGROUND_TASKS.append(asyncio.create_task(meme_reload_loop()))
+    if VOTE_WRITE_BEHIND:
+        BACKGROUND_TASKS.append(asyncio.create_task(VOTE_BUFFER.run()))
+    if PREWARM_ENABLED:
+        BACKGROUND_TASKS.append(asyncio.create_task(prewarm_loop()))
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in BACKGROUND_TASKS:
+        task.cancel()
+    await asyncio.gather(*BACKGROUND_TASKS, return_exceptions=True)
+    BACKGROUND_TASKS.clear()
+    try:
+        await VOTE_BUFFER.flush()
+    except Exception as e:
+        log.error("final vote flush failed", extra={"votes_lost": len(VOTE_BUFFER), "error": str(e)})
+    await close_http_clients()
+    await async_engine.dispose()
 
 
 # =========================================================
@@ -91,6 +330,10 @@ class VoteReq(BaseModel):
     value: int
 
 
+class VoteBatchReq(BaseModel):
+    votes: list[VoteReq]
+
+
 # =========================================================
 # Helpers
 # =========================================================
@@ -104,38 +347,68 @@ def stable_news_id(source: str, title: str | None, published_at: str | None) ->
 
 def load_meme_catalog():
     """
-    Loads memes.json once on startup.
+    Loads memes.json and builds a new MemeIndex, then swaps it in.
+    On a failed reload the previous index stays in place.
     """
-    global MEME_CATALOG
+    global MEME_INDEX
     try:
-        p = Path(MEMES_FILE)
-        data = json.loads(p.read_text(encoding="utf-8"))
-        MEME_CATALOG = data.get("memes", []) or []
+        mtime = os.stat(MEMES_FILE).st_mtime
+        index = MemeIndex(read_catalog(MEMES_FILE))
     except Exception as e:
-        print("Failed to load memes.json:", e)
-        MEME_CATALOG = []
+        log.error("failed to load meme catalog", extra={"file": MEMES_FILE, "error": str(e)})
+        MEMES_STATUS["errors"] += 1
+        return
+
+    MEME_INDEX = index
+    if MEMES_STATUS["loaded_at"] is not None:
+        MEMES_STATUS["reloads"] += 1
+    MEMES_STATUS.update(mtime=mtime, loaded_at=datetime.utcnow().isoformat() + "Z")
+
+
+async def meme_reload_loop():
+    """
+    Hot reload: rebuilds the index when MEMES_FILE's mtime changes.
+    """
+    while True:
+        await asyncio.sleep(MEMES_RELOAD_INTERVAL)
+        try:
+            mtime = os.stat(MEMES_FILE).st_mtime
+        except OSError:
+            continue
+        if mtime != MEMES_STATUS["mtime"]:
+            await asyncio.to_thread(load_meme_catalog)
 
 
-def get_user_id(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> int:
+async def get_user_id(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> int:
     """
     JWT auth. Token is expected in Authorization: Bearer <token>
+    async: a cache lookup (or one HMAC check) is cheaper than FastAPI's threadpool hop for sync deps.
     """
     token = creds.credentials
+    key = hashlib.sha256(token.encode("utf-8")).digest()
 
-    secret = os.getenv("JWT_SECRET")
-    if not secret:
-        raise HTTPException(500, "JWT_SECRET is not set")
+    cached = TOKEN_CACHE.get(key)
+    if cached is not None:
+        return cached[0]
 
-    alg = os.getenv("JWT_ALGORITHM", "HS256")
+    if not JWT_SECRET:
+        raise HTTPException(500, "JWT_SECRET is not set")
 
     try:
-        payload = jwt.decode(token, secret, algorithms=[alg])
-        return int(payload["sub"])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        user_id = int(payload["sub"])
     except jwt.ExpiredSignatureError:
         raise HTTPException(401, "Token expired")
     except Exception:
         raise HTTPException(401, "Invalid token")
 
+    # Tokens without exp never expire; keep them for the default TTL only
+    exp = payload.get("exp")
+    ttl = float(exp) - time.time() if isinstance(exp, (int, float)) else None
+    if ttl is None or ttl > 0:
+        TOKEN_CACHE.set(key, (user_id, exp), ttl=ttl)
+    return user_id
+
 
 def _ensure_json(value, default):
     """
@@ -151,17 +424,20 @@ def _ensure_json(value, default):
     return value
 
 
-def load_user_preferences(conn, user_id: int) -> dict | None:
+async def load_user_preferences(conn, user_id: int) -> dict | None:
     q = text("""
         SELECT crypto_assets, investor_type, content_type
         FROM user_preferences
         WHERE user_id = :id
         LIMIT 1
     """)
-    row = conn.execute(q, {"id": user_id}).fetchone()
+    row = (await conn.execute(q, {"id": user_id})).fetchone()
     if row is None:
         return None
+    return _prefs_from_row(row)
 
+
+def _prefs_from_row(row) -> dict:
     assets = _ensure_json(row.crypto_assets, [])
     content = _ensure_json(row.content_type, [])
 
@@ -178,78 +454,339 @@ def load_user_preferences(conn, user_id: int) -> dict | None:
     }
 
 
-def load_daily_dashboard(conn, user_id: int, day_: date):
+async def load_user_context(conn, user_id: int, day_: date, include_snapshot: bool = True,
+                            include_votes: bool = False) -> dict | None:
+    """
+    One round trip for everything a page load needs: the user, their preferences,
+    the latest snapshot for day_ and (optionally) that snapshot's votes.
+    Returns None if the user doesn't exist; "preferences"/"dashboard" are None when missing.
+    """
     q = text("""
-        SELECT id, sections
-        FROM daily_dashboard
-        WHERE user_id = :user_id AND day = :day
-        ORDER BY created_at DESC
-        LIMIT 1
+        SELECT u.id, u.name, u.email,
+               p.crypto_assets, p.investor_type, p.content_type,
+               d.id AS dashboard_id, d.sections, d.parts,
+               v.votes
+        FROM users u
+        LEFT JOIN user_preferences p ON p.user_id = u.id
+        LEFT JOIN LATERAL (
+            SELECT dd.id, dd.sections,
+                   (SELECT jsonb_object_agg(m.name, s.content)
+                    FROM dashboard_snapshot_sections m
+                    JOIN dashboard_sections s ON s.id = m.section_id
+                    WHERE m.dashboard_id = dd.id) AS parts
+            FROM daily_dashboard dd
+            WHERE dd.user_id = u.id AND dd.day = :day AND CAST(:include_snapshot AS boolean)
+            ORDER BY dd.created_at DESC
+            LIMIT 1
+        ) d ON true
+        LEFT JOIN LATERAL (
+            SELECT jsonb_agg(jsonb_build_object('section', uv.section, 'item', uv.item, 'value', uv.value)) AS votes
+            FROM user_votes uv
+            WHERE uv.dashboard_id = d.id AND uv.user_id = u.id AND CAST(:include_votes AS boolean)
+        ) v ON true
+        WHERE u.id = :user_id
+    """)
+    row = (await conn.execute(q, {
+        "user_id": user_id,
+        "day": day_,
+        "include_snapshot": include_snapshot,
+        "include_votes": include_votes,
+    })).fetchone()
+    if row is None:
+        return None
+
+    dashboard = None
+    if row.dashboard_id is not None:
+        sections = _ensure_json(row.parts, None)
+        if sections is None:
+            sections = _ensure_json(row.sections, {})
+        dashboard = {"dashboard_id": int(row.dashboard_id), "sections": sections}
+
+    return {
+        "user": {"id": row.id, "name": row.name, "email": row.email},
+        "preferences": _prefs_from_row(row) if row.investor_type is not None else None,
+        "dashboard": dashboard,
+        "votes": VOTE_BUFFER.merge(
+            _ensure_json(row.votes, []) or [], user_id, dashboard_id=dashboard["dashboard_id"],
+        ) if include_votes and dashboard else ([] if include_votes else None),
+    }
+
+
+async def load_snapshot_votes(conn, user_id: int, dashboard_id: int) -> list[dict]:
+    q = text("""
+        SELECT section, item, value
+        FROM user_votes
+        WHERE user_id = :user_id AND dashboard_id = :dashboard_id
+    """)
+    rows = (await conn.execute(q, {"user_id": user_id, "dashboard_id": dashboard_id})).fetchall()
+    votes = [{"section": r[0], "item": r[1], "value": r[2]} for r in rows]
+    return VOTE_BUFFER.merge(votes, user_id, dashboard_id=dashboard_id)
+
+
+async def load_daily_dashboard(conn, user_id: int, day_: date):
+    """
+    Latest snapshot for the day, assembled from its section versions.
+    Legacy snapshots (no mapping rows) still carry their content in daily_dashboard.sections.
+    """
+    q = text("""
+        SELECT d.id, d.sections,
+               jsonb_object_agg(m.name, s.content) FILTER (WHERE m.name IS NOT NULL) AS parts
+        FROM (
+            SELECT id, sections
+            FROM daily_dashboard
+            WHERE user_id = :user_id AND day = :day
+            ORDER BY created_at DESC
+            LIMIT 1
+        ) d
+        LEFT JOIN dashboard_snapshot_sections m ON m.dashboard_id = d.id
+        LEFT JOIN dashboard_sections s ON s.id = m.section_id
+        GROUP BY d.id, d.sections
+    """)
+    row = (await conn.execute(q, {"user_id": user_id, "day": day_})).fetchone()
+    if row is None:
+        return None
+
+    sections = _ensure_json(row.parts, None)
+    if sections is None:
+        sections = _ensure_json(row.sections, {})
+
+    return {"dashboard_id": int(row.id), "sections": sections}
+
+
+async def load_latest_snapshot(conn, user_id: int):
+    """
+    The user's most recent snapshot of any day (load-shedding fallback), with its day.
+    """
+    q = text("""
+        SELECT d.id, d.day, d.sections,
+               jsonb_object_agg(m.name, s.content) FILTER (WHERE m.name IS NOT NULL) AS parts
+        FROM (
+            SELECT id, day, sections
+            FROM daily_dashboard
+            WHERE user_id = :user_id
+            ORDER BY day DESC, created_at DESC
+            LIMIT 1
+        ) d
+        LEFT JOIN dashboard_snapshot_sections m ON m.dashboard_id = d.id
+        LEFT JOIN dashboard_sections s ON s.id = m.section_id
+        GROUP BY d.id, d.day, d.sections
     """)
-    row = conn.execute(q, {"user_id": user_id, "day": day_}).fetchone()
+    row = (await conn.execute(q, {"user_id": user_id})).fetchone()
     if row is None:
         return None
 
-    sections = row[1]
-    if isinstance(sections, str):
-        sections = json.loads(sections)
+    sections = _ensure_json(row.parts, None)
+    if sections is None:
+        sections = _ensure_json(row.sections, {})
 
-    return {"dashboard_id": int(row[0]), "sections": sections}
+    return {"dashboard_id": int(row.id), "day": row.day, "sections": sections}
 
 
-def save_daily_dashboard(conn, user_id: int, day_: date, sections: dict) -> int:
+async def reserve_dashboard_id(conn, user_id: int, day_: date) -> int:
+    """
+    Inserts the (still empty) daily_dashboard row of a streaming build up front, so votes on
+    sections that have already arrived find their dashboard; sections are attached as they're saved.
+    """
+    SNAPSHOT_CACHE.pop((user_id, day_))
+    return await _insert_snapshot(conn, user_id, day_)
+
+
+def section_hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+async def _insert_snapshot(conn, user_id: int, day_: date) -> int:
+    # Section content lives in dashboard_sections; the snapshot row only anchors id/history/votes
     q = text("""
         INSERT INTO daily_dashboard (user_id, day, sections)
-        VALUES (:user_id, :day, CAST(:sections AS jsonb))
+        VALUES (:user_id, :day, CAST('{}' AS jsonb))
         RETURNING id
     """)
-    row = conn.execute(q, {
+    row = (await conn.execute(q, {"user_id": user_id, "day": day_})).fetchone()
+    return int(row[0])
+
+
+async def _save_section_versions(conn, user_id: int, day_: date, values: dict) -> dict:
+    """
+    Returns {name: id} of the (user, day, name, content hash) versions of `values`,
+    inserting the new ones; one statement for any number of sections.
+    """
+    if not values:
+        return {}
+    params = {
         "user_id": user_id,
         "day": day_,
-        "sections": json.dumps(sections),
-    }).fetchone()
-    return int(row[0])
+        "names": list(values),
+        "hashes": [section_hash(v) for v in values.values()],
+        "contents": [json.dumps(v) for v in values.values()],
+    }
+    # Every CTE sees the pre-statement snapshot: existing versions come from the SELECT, new ones from ins
+    q = text("""
+        WITH v AS (
+            SELECT * FROM unnest(
+                CAST(:names AS text[]), CAST(:hashes AS text[]), CAST(:contents AS text[])
+            ) AS v(name, content_hash, content)
+        ),
+        ins AS (
+            INSERT INTO dashboard_sections (user_id, day, name, content_hash, content)
+            SELECT CAST(:user_id AS bigint), CAST(:day AS date), name, content_hash, CAST(content AS jsonb) FROM v
+            ON CONFLICT (user_id, day, name, content_hash) DO NOTHING
+            RETURNING name, id
+        )
+        SELECT name, id FROM ins
+        UNION ALL
+        SELECT s.name, s.id
+        FROM dashboard_sections s
+        JOIN v ON s.name = v.name AND s.content_hash = v.content_hash
+        WHERE s.user_id = :user_id AND s.day = :day
+    """)
+    ids = {name: int(section_id) for name, section_id in (await conn.execute(q, params)).fetchall()}
+    if len(ids) < len(values):
+        # A concurrent transaction inserted some of the versions after our statement snapshot
+        ids.update({name: int(section_id) for name, section_id in (await conn.execute(text("""
+            SELECT s.name, s.id
+            FROM dashboard_sections s
+            JOIN unnest(CAST(:names AS text[]), CAST(:hashes AS text[])) AS v(name, content_hash)
+              ON s.name = v.name AND s.content_hash = v.content_hash
+            WHERE s.user_id = :user_id AND s.day = :day
+        """), params)).fetchall()})
+    return ids
+
+
+async def _save_section_version(conn, user_id: int, day_: date, name: str, value) -> int:
+    return (await _save_section_versions(conn, user_id, day_, {name: value}))[name]
+
+
+async def _link_sections(conn, dashboard_id: int, section_ids: dict):
+    # A reserved (streaming) snapshot may already have had a section added by complete_sections()
+    if not section_ids:
+        return
+    q = text("""
+        INSERT INTO dashboard_snapshot_sections (dashboard_id, name, section_id)
+        SELECT CAST(:dashboard_id AS bigint), name, section_id
+        FROM unnest(CAST(:names AS text[]), CAST(:section_ids AS bigint[])) AS l(name, section_id)
+        ON CONFLICT (dashboard_id, name) DO UPDATE SET section_id = EXCLUDED.section_id
+    """)
+    await conn.execute(q, {
+        "dashboard_id": dashboard_id, "names": list(section_ids), "section_ids": list(section_ids.values()),
+    })
 
 
-def pick_meme(prefs: dict, exclude_ids_or_urls: set[str] | None = None) -> dict:
+async def save_daily_dashboard(conn, user_id: int, day_: date, sections: dict, dashboard_id: int | None = None) -> int:
     """
-    Picks a meme based on preferences (weighted),
-    and supports exclude set to avoid same meme on refresh.
+    Writes a new snapshot, or attaches the sections to one inserted by reserve_dashboard_id().
     """
-    exclude_ids_or_urls = exclude_ids_or_urls or set()
+    SNAPSHOT_CACHE.pop((user_id, day_))
+    if dashboard_id is None:
+        dashboard_id = await _insert_snapshot(conn, user_id, day_)
+    await _link_sections(conn, dashboard_id, await _save_section_versions(conn, user_id, day_, sections))
+    return dashboard_id
 
-    investor_type = (prefs.get("investor_type") or "").strip().lower()
-    content = prefs.get("content_type") or []
-    assets = prefs.get("crypto_assets") or []
 
-    content_set = set(str(x).lower() for x in (content if isinstance(content, list) else [content]))
-    assets_set = set(str(x).lower() for x in (assets if isinstance(assets, list) else [assets]))
+async def save_dashboard_section(conn, user_id: int, day_: date, base: dict, name: str, value) -> int | None:
+    """
+    New snapshot that differs from `base` ({dashboard_id, sections}) in one section only:
+    writes that section's version and re-links the others. Returns None (nothing written)
+    when the section content is unchanged.
+    """
+    base_sections = base.get("sections") or {}
+    if name in base_sections and section_hash(base_sections[name]) == section_hash(value):
+        return None
 
-    candidates: list[tuple[int, dict]] = []
-    for m in (MEME_CATALOG or []):
-        mid = str(m.get("id") or "")
-        url = str(m.get("url") or "")
-        if not url:
-            continue
-        if mid in exclude_ids_or_urls or url in exclude_ids_or_urls:
-            continue
+    SNAPSHOT_CACHE.pop((user_id, day_))
+    dashboard_id = await _insert_snapshot(conn, user_id, day_)
+    copied = (await conn.execute(text("""
+        INSERT INTO dashboard_snapshot_sections (dashboard_id, name, section_id)
+        SELECT :dashboard_id, name, section_id
+        FROM dashboard_snapshot_sections
+        WHERE dashboard_id = :base_id AND name <> :name
+    """), {"dashboard_id": dashboard_id, "base_id": base["dashboard_id"], "name": name})).rowcount
 
-        tags = (m.get("tags") or {})
-        inv_tags = set(x.lower() for x in (tags.get("investor") or []))
-        con_tags = set(x.lower() for x in (tags.get("content") or []))
-        ast_tags = set(x.lower() for x in (tags.get("assets") or []))
+    values = {name: value}
+    if not copied:
+        # Legacy base snapshot (content inline in daily_dashboard.sections): version its sections once
+        values = {**{other: v for other, v in base_sections.items() if other != name}, name: value}
 
-        score = 0
-        if investor_type and investor_type in inv_tags:
-            score += 4
+    await _link_sections(conn, dashboard_id, await _save_section_versions(conn, user_id, day_, values))
+    return dashboard_id
 
-        score += 2 * len(content_set.intersection(con_tags))
-        score += min(3, len(assets_set.intersection(ast_tags)))  # cap so assets don't dominate
 
-        candidates.append((score, m))
+async def add_snapshot_section(conn, user_id: int, day_: date, dashboard_id: int, name: str, value) -> int:
+    """
+    Adds a section the snapshot was persisted without, to it and to the day's later snapshots
+    that still lack it (refreshes taken meanwhile). Snapshot ids, and so their votes, are kept.
+    Returns the number of snapshots updated.
+    """
+    section_id = await _save_section_version(conn, user_id, day_, name, value)
+    linked = (await conn.execute(text("""
+        INSERT INTO dashboard_snapshot_sections (dashboard_id, name, section_id)
+        SELECT d.id, :name, :section_id
+        FROM daily_dashboard d
+        WHERE d.user_id = :user_id AND d.day = :day AND d.id >= :dashboard_id
+          AND NOT EXISTS (
+              SELECT 1 FROM dashboard_snapshot_sections m WHERE m.dashboard_id = d.id AND m.name = :name
+          )
+        ON CONFLICT (dashboard_id, name) DO NOTHING
+    """), {
+        "user_id": user_id, "day": day_, "dashboard_id": dashboard_id, "name": name, "section_id": section_id,
+    })).rowcount
+    SNAPSHOT_CACHE.pop((user_id, day_))
+    return linked
+
+
+def downsample_lttb(points: list, threshold: int) -> list:
+    """
+    Largest-Triangle-Three-Buckets downsampling for [[ts, value], ...] series.
+    Keeps the first/last points and the visually significant ones in between.
+    """
+    points = [p for p in (points or []) if isinstance(p, (list, tuple)) and len(p) >= 2
+              and isinstance(p[0], (int, float)) and isinstance(p[1], (int, float))]
+    n = len(points)
+    if threshold < 3 or n <= threshold:
+        return points
+
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_range = points[avg_start:avg_end]
+        avg_x = sum(p[0] for p in avg_range) / len(avg_range)
+        avg_y = sum(p[1] for p in avg_range) / len(avg_range)
+
+        ax, ay = points[a][0], points[a][1]
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+
+        max_area = -1.0
+        next_a = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                next_a = j
+
+        sampled.append(points[next_a])
+        a = next_a
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def pick_meme(prefs: dict, exclude_ids_or_urls: set[str] | None = None, feedback: Feedback | None = None) -> dict:
+    """
+    Picks a meme based on preferences and vote feedback (weighted),
+    and supports exclude set to avoid same meme on refresh.
+    """
+    index = MEME_INDEX
+    investor_type, content_set, assets_set = profile_key(prefs)
 
-    if not candidates:
-        pool = MEME_CATALOG or [
+    chosen = index.sample(prefs, exclude_ids_or_urls, feedback)
+    if chosen is None:
+        pool = index.raw or [
             {"id": "fallback_hodl", "title": "HODL mode", "url": "https://i.imgflip.com/1bij.jpg"},
             {"id": "fallback_moon", "title": "To the moon", "url": "https://i.imgflip.com/30b1gx.jpg"},
             {"id": "fallback_bhsl", "title": "Buy high sell low", "url": "https://i.imgflip.com/1ur9b0.jpg"},
@@ -258,9 +795,6 @@ def pick_meme(prefs: dict, exclude_ids_or_urls: set[str] | None = None) -> dict:
         chosen["reason"] = {"mode": "fallback"}
         return chosen
 
-    weights = [(max(0, s) + 1) for (s, _) in candidates]
-    chosen = random.choices([m for (_, m) in candidates], weights=weights, k=1)[0]
-
     chosen = dict(chosen)
     chosen["reason"] = {
         "investor_type": investor_type,
@@ -270,114 +804,245 @@ def pick_meme(prefs: dict, exclude_ids_or_urls: set[str] | None = None) -> dict:
     return chosen
 
 
+# Upstream base URLs. Override to run against local stubs (bench/upstream_stubs.py).
+COINGECKO_BASE_URL = os.getenv("COINGECKO_BASE_URL", "").rstrip("/")  # empty: picked by COINGECKO_MODE
+CRYPTOPANIC_BASE_URL = os.getenv("CRYPTOPANIC_BASE_URL", "https://cryptopanic.com/api/developer/v2").rstrip("/")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+
+
 def coingecko_base_url() -> str:
+    if COINGECKO_BASE_URL:
+        return COINGECKO_BASE_URL
     mode = os.getenv("COINGECKO_MODE", "demo").lower()
     return "https://pro-api.coingecko.com/api/v3" if mode == "pro" else "https://api.coingecko.com/api/v3"
 
 
+def coingecko_headers() -> dict:
+    key = os.getenv("COINGECKO_API_KEY")
+    return {"x-cg-demo-api-key": key} if key else {}
+
+
+async def get_simple_price(ids: list[str]):
+    """
+    Single-flighted CoinGecko /simple/price for a batch of ids. Returns the raw response.
+    """
+    ids = sorted(set(ids))
+    return await UPSTREAM_FLIGHTS.do(
+        ("simple_price", tuple(ids)),
+        lambda: scheduled("coingecko", lambda: get_client("coingecko").get(
+            f"{coingecko_base_url()}/simple/price",
+            params={"ids": ",".join(ids), "vs_currencies": "usd", "include_24hr_change": "true"},
+            headers=coingecko_headers(),
+        )),
+    )
+
+
+async def get_market_chart(asset: str, days: int):
+    """
+    Single-flighted CoinGecko /coins/{id}/market_chart. Returns the raw response.
+    """
+    return await UPSTREAM_FLIGHTS.do(
+        ("market_chart", asset, days),
+        lambda: scheduled("coingecko", lambda: get_client("coingecko").get(
+            f"{coingecko_base_url()}/coins/{asset}/market_chart",
+            params={"vs_currency": "usd", "days": days},
+            headers=coingecko_headers(),
+        )),
+    )
+
+
 def create_access_token(user_id: int) -> str:
-    secret = os.getenv("JWT_SECRET")
-    if not secret:
+    if not JWT_SECRET:
         raise HTTPException(500, "JWT_SECRET is not set")
-    alg = os.getenv("JWT_ALGORITHM", "HS256")
     payload = {
         "sub": str(user_id),
         "exp": datetime.utcnow() + timedelta(hours=1),
     }
-    return jwt.encode(payload, secret, algorithm=alg)
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+async def update_price_cache(ids: list[str], ttl: float | None = None) -> tuple[dict, str | None]:
+    """
+    One /simple/price call for ids; every id is cached (unknown ids as {}, so they don't
+    trigger a call on every request). Returns ({id: row} for known ids, error or None).
+    """
+    r = await get_simple_price(ids)
+    if r.status_code == 429:
+        return {}, "CoinGecko rate-limited (429)"
+    if r.status_code != 200:
+        return {}, f"CoinGecko status {r.status_code}"
+    j = r.json() or {}
+    for cid in ids:
+        PRICE_CACHE.set(cid, j.get(cid) or {}, ttl=ttl)
+    return {cid: j[cid] for cid in ids if j.get(cid)}, None
 
 
-async def fetch_prices(client: httpx.AsyncClient, assets: list[str]):
+async def fetch_prices(assets: list[str]):
     """
-    CoinGecko /simple/price.
-    Returns consistent shape: {source, data, error}
+    CoinGecko /simple/price, cached per coin id.
+    Cached coins are served from PRICE_CACHE; only the missing ids go upstream, in one batched call.
+    Expired (last-known-good) rows are served as they are and refreshed in the background;
+    they also stand in for coins the upstream call fails to return.
+    Returns consistent shape: {source, data, error} (+ "stale": true when any row is past its TTL,
+    "final": true when retrying can't help, i.e. no assets or only ids CoinGecko doesn't know)
     """
     prices = {"source": "coingecko", "data": {}, "error": None}
 
     ids = [str(a).strip().lower() for a in assets if str(a).strip()]
+    ids = list(dict.fromkeys(ids))
     if not ids:
         prices["error"] = "No assets to fetch prices for"
+        prices["final"] = True
         return prices
-    key_cache = ",".join(ids)
-    now = time.time()
-    hit = PRICE_CACHE.get(key_cache)
-    if hit and now - hit[0] < PRICE_TTL:
-        return {"source": "coingecko_cache", "data": hit[1], "error": None}
-
-    try:
-        base = coingecko_base_url()
-        params = {"ids": ",".join(ids), "vs_currencies": "usd", "include_24hr_change": "true"}
-        headers = {"x-cg-demo-api-key": os.getenv("COINGECKO_API_KEY")} if os.getenv("COINGECKO_API_KEY") else {}
 
-        r = await client.get(f"{base}/simple/price", params=params, headers=headers)
-        if r.status_code == 200:
-            j = r.json() or {}
-            PRICE_CACHE[key_cache] = (now, j)
-
-            if not j:
-                prices["error"] = "CoinGecko returned empty data (rate-limit or invalid ids)"
-            else:
-                prices["data"] = j
+    found = {}
+    stale = {}
+    missing = []
+    for cid in ids:
+        hit = PRICE_CACHE.get_stale(cid)
+        if hit is None:
+            missing.append(cid)
+        elif hit[2]:
+            found[cid] = hit[0]
         else:
-            prices["error"] = f"CoinGecko status {r.status_code}"
-            
-        if r.status_code == 429:
-            prices["error"] = "CoinGecko rate-limited (429)"
-            return prices
+            stale[cid] = hit[0]
 
-    except Exception as e:
-        prices["error"] = str(e)
+    if not missing:
+        prices["source"] = "coingecko_cache"
+        if stale:
+            prices["source"] = "coingecko_stale"
+            revalidate(("revalidate_prices", tuple(sorted(stale))), lambda: update_price_cache(sorted(stale)))
+    else:
+        # Going upstream anyway: the stale coins ride along in the same batch
+        try:
+            rows, prices["error"] = await update_price_cache(missing + list(stale))
+            found.update(rows)
+            if prices["error"] is None:
+                stale = {}
+        except Exception as e:
+            prices["error"] = str(e)
+
+    if stale:
+        for cid, row in stale.items():
+            found.setdefault(cid, row)
+        prices["stale"] = True
+
+    # Keep the caller's ordering; skip ids CoinGecko doesn't know
+    prices["data"] = {cid: found[cid] for cid in ids if found.get(cid)}
+    if not prices["data"] and not prices["error"]:
+        prices["error"] = "CoinGecko returned empty data (rate-limit or invalid ids)"
+        prices["final"] = True
 
     return prices
 
 
-async def fetch_price_chart(client: httpx.AsyncClient, assets: list[str], days: int = 7):
+def chart_series_from_response(r) -> list:
+    """
+    Extracts the price series from a market_chart response, downsampled to CHART_MAX_POINTS.
+    """
+    j = r.json() or {}
+    return downsample_lttb(j.get("prices") or [], CHART_MAX_POINTS)
+
+
+def chart_miss(r) -> bool:
+    """
+    True for a market_chart response retrying won't fix: a 4xx other than 429 (unknown coin id)
+    or a 200 without a price series.
+    """
+    if r.status_code == 200:
+        return not (r.json() or {}).get("prices")
+    return 400 <= r.status_code < 500 and r.status_code not in (408, 429)
+
+
+async def revalidate_chart(asset: str, days: int):
+    r = await get_market_chart(asset, days)
+    if r.status_code == 200:
+        series = chart_series_from_response(r)
+        if series:
+            CHART_CACHE.set((asset, days), series)
+
+
+async def fetch_price_chart(assets: list[str], days: int = 7):
+    """
+    CoinGecko market_chart per asset; series are read from CHART_CACHE
+    (kept warm by the ingestion worker) and only the misses are fetched, concurrently.
+    Expired series are served as last-known-good ("stale": true) and refreshed in the background.
+    Series are downsampled before they are cached, persisted or returned.
+    Assets CoinGecko has no series for are remembered in CHART_MISSES for CHART_MISS_TTL, and a
+    chart where every asset failed that way is returned with "final": true.
+    """
     chart = {"source": "coingecko", "range": f"{days}d", "data": {}, "error": None}
 
     if not assets:
         chart["error"] = "No assets for chart"
+        chart["final"] = True
         return chart
 
-    base = coingecko_base_url()
-    cg_key = os.getenv("COINGECKO_API_KEY")
-    headers = {"x-cg-demo-api-key": os.getenv("COINGECKO_API_KEY")} if os.getenv("COINGECKO_API_KEY") else {}
-
     failed = []
-
-    try:
-        for asset in assets:
-            r = await client.get(
-                f"{base}/coins/{asset}/market_chart",
-                params={"vs_currency": "usd", "days": days},
-                headers=headers,
-                timeout=15.0,
-            )
-
+    transient = False
+    series_by_asset = {}
+    missing = []
+    for asset in assets:
+        hit = CHART_CACHE.get_stale((asset, days))
+        if hit is None:
+            if CHART_MISSES.get((asset, days)) is not None:
+                failed.append(asset)
+            else:
+                missing.append(asset)
+            continue
+        series_by_asset[asset] = hit[0]
+        if not hit[2]:
+            chart["stale"] = True
+            revalidate(("revalidate_chart", asset, days), lambda a=asset: revalidate_chart(a, days))
+
+    if missing:
+        results = await asyncio.gather(*(get_market_chart(a, days) for a in missing), return_exceptions=True)
+        errors = []
+        for asset, r in zip(missing, results):
+            if isinstance(r, Exception):
+                errors.append(str(r))
+                failed.append(asset)
+                transient = True
+                continue
+            if chart_miss(r):
+                CHART_MISSES.set((asset, days), r.status_code)
+                failed.append(asset)
+                continue
             if r.status_code != 200:
                 failed.append(asset)
+                transient = True
                 continue
 
-            j = r.json() or {}
-            prices = j.get("prices", [])
-            if prices:
-                chart["data"][asset] = prices
+            series = chart_series_from_response(r)
+            CHART_CACHE.set((asset, days), series)
+            series_by_asset[asset] = series
 
-    except Exception as e:
-        chart["error"] = str(e)
-        return chart
+        if errors and not series_by_asset:
+            chart["error"] = errors[0]
+            return chart
+    else:
+        chart["source"] = "coingecko_stale" if chart.get("stale") else "coingecko_cache"
+
+    # Keep the caller's asset order
+    chart["data"] = {a: series_by_asset[a] for a in assets if a in series_by_asset}
 
     if not chart["data"]:
         chart["error"] = f"CoinGecko chart unavailable (failed assets: {failed[:3]})"
+        chart["final"] = not transient
 
     return chart
 
 
-async def coingecko_search_first_id(client: httpx.AsyncClient, query: str):
+async def coingecko_search_first_id(query: str):
     base = coingecko_base_url()
-    cg_key = os.getenv("COINGECKO_API_KEY")
-    headers = {"x-cg-demo-api-key": os.getenv("COINGECKO_API_KEY")} if os.getenv("COINGECKO_API_KEY") else {}
-
-    r = await client.get(f"{base}/search", params={"query": query}, headers=headers)
+    headers = coingecko_headers()
+
+    r = await UPSTREAM_FLIGHTS.do(
+        ("search", query),
+        lambda: scheduled("coingecko", lambda: get_client("coingecko").get(
+            f"{base}/search", params={"query": query}, headers=headers,
+        )),
+    )
     if r.status_code != 200:
         return None
 
@@ -392,132 +1057,279 @@ async def coingecko_search_first_id(client: httpx.AsyncClient, query: str):
         "symbol": (top.get("symbol") or "").upper(),
         "query": query,
     }
-async def fetch_news(client: httpx.AsyncClient, prefs: dict, limit: int = 5):
+class KeywordMatcher:
+    """
+    Precompiled substring matcher: one regex scan returns every term that occurs in a text,
+    same result as checking `term in text` for each term.
+    """
+
+    def __init__(self, terms):
+        terms = sorted({str(t).lower() for t in terms if str(t).strip()}, key=len, reverse=True)
+        # Zero-width lookahead so matches are tried at every position (overlaps included);
+        # at a given position only the longest term matches, so shorter terms it contains are implied.
+        self._re = re.compile("(?=(" + "|".join(re.escape(t) for t in terms) + "))") if terms else None
+        self._implied = {t: frozenset(u for u in terms if u in t) for t in terms}
+
+    def find(self, text: str) -> set[str]:
+        found = set()
+        if self._re is None or not text:
+            return found
+        for m in self._re.finditer(text):
+            found |= self._implied[m.group(1)]
+        return found
+
+
+# content_type -> (score bonus, title keywords); a group scores once per title
+NEWS_KEYWORD_GROUPS = {
+    "market_news": (1, ["price", "market", "surge", "drop"]),
+    "security": (2, ["hack", "exploit", "breach"]),
+    "regulation": (2, ["sec", "law", "court", "regulation"]),
+}
+NEWS_KEYWORD_TERMS = {}  # keyword -> groups containing it
+for _group, (_, _words) in NEWS_KEYWORD_GROUPS.items():
+    for _w in _words:
+        NEWS_KEYWORD_TERMS.setdefault(_w, set()).add(_group)
+NEWS_KEYWORD_MATCHER = KeywordMatcher(NEWS_KEYWORD_TERMS)
+
+NEWS_TTL = int(os.getenv("NEWS_TTL", "300"))
+NEWS_STALE_TTL = int(os.getenv("NEWS_STALE_TTL", "21600"))
+NEWS_CACHE = TTLCache(maxsize=8, ttl=NEWS_TTL, stale_ttl=NEWS_STALE_TTL)  # feed key -> indexed CryptoPanic results
+
+
+@lru_cache(maxsize=1024)
+def asset_matcher(assets: tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(assets)
+
+
+class NewsUnavailable(Exception):
+    def __init__(self, error: str, fallback_key: str, summary: str):
+        super().__init__(error)
+        self.fallback_key = fallback_key
+        self.summary = summary
+
+
+def news_fallback(error: str, fallback_key: str, summary: str, title: str = "News temporarily unavailable") -> dict:
+    return {
+        "source": "static",
+        "data": [{
+            "id": stable_news_id("fallback", fallback_key, None),
+            "title": title,
+            "summary": summary,
+            "published_at": None,
+        }],
+        "error": error,
+    }
+
+
+NEWS_FEED_KEY = ("hot", "BTC,ETH")
+
+
+async def get_news_feed(token: str) -> tuple[list[dict], bool]:
+    """
+    CryptoPanic hot posts, fetched once per NEWS_TTL window and shared by every user.
+    Each entry is pre-indexed: output item, lower-cased title, matched keywords and keyword groups.
+    -> (feed, stale). An expired feed is returned as it is and refreshed in the background.
+    Raises NewsUnavailable on upstream failure when there is no last-known-good feed.
+    """
+    hit = NEWS_CACHE.get_stale(NEWS_FEED_KEY)
+    if hit is not None:
+        feed, _, fresh = hit
+        if not fresh:
+            revalidate(("revalidate_news", NEWS_FEED_KEY), lambda: load_news_feed(token))
+        return feed, not fresh
+    return await load_news_feed(token), False
+
+
+async def load_news_feed(token: str) -> list[dict]:
+    """
+    Fetches, indexes and caches the feed (single-flighted). Raises NewsUnavailable.
+    """
+    url = f"{CRYPTOPANIC_BASE_URL}/posts/"
+    params = {
+        "auth_token": token,
+        "public": "true",
+        "kind": "news",
+        "filter": "hot",
+        "currencies": "BTC,ETH",  # unchanged
+    }
+    feed_key = NEWS_FEED_KEY
+    headers = {
+        "User-Agent": "crypto-investor-dashboard/1.0",
+        "Accept": "application/json",
+    }
+
+    response = await UPSTREAM_FLIGHTS.do(
+        ("news", feed_key),
+        lambda: scheduled("cryptopanic", lambda: get_client("cryptopanic").get(url, params=params, headers=headers)),
+    )
+    content_type = (response.headers.get("content-type") or "").lower()
+
+    if response.status_code != 200:
+        raise NewsUnavailable(
+            f"CryptoPanic status {response.status_code}",
+            "News fetch failed",
+            "Unable to fetch crypto news at the moment.",
+        )
+
+    if "application/json" not in content_type:
+        raise NewsUnavailable(
+            "CryptoPanic returned non-JSON response",
+            "News blocked",
+            "Unexpected response from news provider.",
+        )
+
+    payload = response.json() or {}
+    feed = []
+    for i in (payload.get("results") or []):
+        title_lc = (i.get("title") or "").lower()
+        keywords = frozenset(NEWS_KEYWORD_MATCHER.find(title_lc))
+        groups = set()
+        for kw in keywords:
+            groups |= NEWS_KEYWORD_TERMS[kw]
+        feed.append({
+            "title_lc": title_lc,
+            "groups": frozenset(groups),
+            "keywords": keywords,
+            "item": {
+                "id": stable_news_id("cryptopanic", i.get("title"), i.get("published_at")),
+                "title": i.get("title"),
+                "summary": (
+                    i.get("description")
+                    or (i.get("metadata") or {}).get("description")
+                    or (i.get("metadata") or {}).get("summary")
+                    or i.get("text")
+                    or ""
+                ),
+                "published_at": i.get("published_at"),
+            },
+        })
+
+    NEWS_CACHE.set(feed_key, feed)
+    return feed
+
+
+def rank_news(feed: list[dict], prefs: dict, limit: int, feedback: Feedback | None = None) -> list[dict]:
+    """
+    Per-user ranking of the shared feed: +3 per matching asset, plus the keyword group
+    bonus for each content type the user picked, plus (with feedback) the user's keyword
+    affinity and the item's vote popularity. Stable for equal scores.
+    """
+    assets = tuple(sorted({str(a).lower() for a in (prefs.get("crypto_assets") or []) if str(a).strip()}))
+    content_types = set(prefs.get("content_type") or [])
+    matcher = asset_matcher(assets)
+    bonuses = [(g, bonus) for g, (bonus, _) in NEWS_KEYWORD_GROUPS.items() if g in content_types]
+
+    scored = []
+    for entry in feed:
+        score = 3 * len(matcher.find(entry["title_lc"]))
+        for g, bonus in bonuses:
+            if g in entry["groups"]:
+                score += bonus
+        if feedback is not None:
+            score += feedback.affinity_bonus("news_keyword", entry["keywords"])
+            score += feedback.item_bonus("news", entry["item"]["id"])
+        scored.append((score, entry["item"]))
+
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [dict(item) for (_, item) in scored[:limit]]
+
+
+async def fetch_news(prefs: dict, limit: int = 5, feedback: Feedback | None = None):
     """
     Fetch crypto news from CryptoPanic Developer API (v2).
 
     - Uses public usage mode (public=true)
+    - The raw feed is shared across users (get_news_feed); only ranking is per user
     - Returns a stable structure: {source, data, error}
     - Does not expose url/source fields (not needed by the app)
     """
-
-    news = {"source": "cryptopanic", "data": [], "error": None}
     token = os.getenv("CRYPTOPANIC_TOKEN")
 
     if not token:
-        news["error"] = "CRYPTOPANIC_TOKEN missing"
-        news["source"] = "static"
-        news["data"] = [{
-            "id": stable_news_id("fallback", "No CryptoPanic token", None),
-            "title": "News unavailable",
-            "summary": "CryptoPanic token is not configured.",
-            "published_at": None,
-        }]
-        return news
+        return news_fallback(
+            "CRYPTOPANIC_TOKEN missing",
+            "No CryptoPanic token",
+            "CryptoPanic token is not configured.",
+            title="News unavailable",
+        )
 
     try:
-        url = "https://cryptopanic.com/api/developer/v2/posts/"
-        params = {
-            "auth_token": token,
-            "public": "true",
-            "kind": "news",
-            "filter": "hot",
-            "currencies": "BTC,ETH",  # unchanged
-        }
-        headers = {
-            "User-Agent": "crypto-investor-dashboard/1.0",
-            "Accept": "application/json",
-        }
+        feed, stale = await get_news_feed(token)
+    except NewsUnavailable as e:
+        return news_fallback(str(e), e.fallback_key, e.summary)
+    except Exception as e:
+        return news_fallback(str(e), "News fetch error", "An error occurred while fetching news.")
 
-        response = await client.get(url, params=params, headers=headers, timeout=15.0)
-        content_type = (response.headers.get("content-type") or "").lower()
-
-        if response.status_code != 200:
-            news["error"] = f"CryptoPanic status {response.status_code}"
-            news["source"] = "static"
-            news["data"] = [{
-                "id": stable_news_id("fallback", "News fetch failed", None),
-                "title": "News temporarily unavailable",
-                "summary": "Unable to fetch crypto news at the moment.",
-                "published_at": None,
-            }]
-            return news
-
-        if "application/json" not in content_type:
-            news["error"] = "CryptoPanic returned non-JSON response"
-            news["source"] = "static"
-            news["data"] = [{
-                "id": stable_news_id("fallback", "News blocked", None),
-                "title": "News temporarily unavailable",
-                "summary": "Unexpected response from news provider.",
-                "published_at": None,
-            }]
-            return news
-
-        payload = response.json() or {}
-        items = payload.get("results") or []
-
-        assets = set((prefs.get("crypto_assets") or []))
-        content_types = set((prefs.get("content_type") or []))
-
-        scored = []
-        for item in items:
-            title = (item.get("title") or "").lower()
-            score = 0
-
-            for a in assets:
-                if a.lower() in title:
-                    score += 3
-
-            if "market_news" in content_types and any(
-                k in title for k in ["price", "market", "surge", "drop"]
-            ):
-                score += 1
-
-            if "security" in content_types and any(
-                k in title for k in ["hack", "exploit", "breach"]
-            ):
-                score += 2
-
-            if "regulation" in content_types and any(
-                k in title for k in ["sec", "law", "court", "regulation"]
-            ):
-                score += 2
-
-            scored.append((score, item))
-
-        scored.sort(key=lambda x: x[0], reverse=True)
-
-        news["data"] = [{
-            "id": stable_news_id("cryptopanic", i.get("title"), i.get("published_at")),
-            "title": i.get("title"),
-            "summary": (
-                i.get("description")
-                or (i.get("metadata") or {}).get("description")
-                or (i.get("metadata") or {}).get("summary")
-                or i.get("text")
-                or ""
-            ),
-            "published_at": i.get("published_at"),
-        } for (_, i) in scored[:limit]]
-
-        return news
+    news = {"source": "cryptopanic", "data": rank_news(feed, prefs, limit, feedback), "error": None}
+    if stale:
+        news["source"] = "cryptopanic_stale"
+        news["stale"] = True
+    return news
 
-    except Exception as e:
-        news["error"] = str(e)
-        news["source"] = "static"
-        news["data"] = [{
-            "id": stable_news_id("fallback", "News fetch error", None),
-            "title": "News temporarily unavailable",
-            "summary": "An error occurred while fetching news.",
-            "published_at": None,
-        }]
-        return news
 
-async def fetch_ai_insight(client: httpx.AsyncClient, investor_type: str, assets: list[str]):
+def news_item_keywords(item_id: str) -> frozenset:
+    """
+    Keywords of a news item still in the cached feed (empty once it has aged out).
+    """
+    for key in NEWS_CACHE.ages():
+        hit = NEWS_CACHE.get_with_age(key, stale=True)
+        if hit is None:
+            continue
+        for entry in hit[0]:
+            if entry["item"]["id"] == item_id:
+                return entry["keywords"]
+    return frozenset()
+
+
+INSIGHT_CACHE = TTLCache(maxsize=int(os.getenv("INSIGHT_CACHE_MAX", "2000")), ttl=24 * 60 * 60)
+# (investor_type, asset set) -> (UTC day, latest generated insight), whatever the regime.
+# Within INSIGHT_SWR_TTL and the same day it answers a new cache key at once while the new insight
+# is generated in the background (a new day always waits for its own insight, e.g. for prewarmed
+# snapshots); for INSIGHT_STALE_TTL after that it only stands in for failed generations.
+INSIGHT_LAST_GOOD = TTLCache(
+    maxsize=int(os.getenv("INSIGHT_CACHE_MAX", "2000")),
+    ttl=int(os.getenv("INSIGHT_SWR_TTL", "3600")),
+    stale_ttl=int(os.getenv("INSIGHT_STALE_TTL", "172800")),
+)
+
+
+def market_regime(price_data: dict, assets: list[str]) -> tuple[str, str, str]:
+    """
+    (market_trend, btc_trend, volatility) derived from /simple/price 24h changes.
+    """
+    market_trend = "unknown"
+    btc_trend = "unknown"
+    volatility = "unknown"
+
+    changes = []
+    for a in assets:
+        ch = (price_data.get(a) or {}).get("usd_24h_change")
+        if isinstance(ch, (int, float)):
+            changes.append(float(ch))
+
+    if changes:
+        avg = sum(changes) / len(changes)
+        avg_abs = sum(abs(x) for x in changes) / len(changes)
+        market_trend = "bullish" if avg > 0.6 else ("bearish" if avg < -0.6 else "sideways")
+        volatility = "high" if avg_abs >= 6 else ("medium" if avg_abs >= 2.5 else "low")
+
+    btc_ch = (price_data.get("bitcoin") or {}).get("usd_24h_change")
+    if isinstance(btc_ch, (int, float)):
+        btc_trend = "up" if btc_ch > 0.6 else ("down" if btc_ch < -0.6 else "flat")
+
+    return market_trend, btc_trend, volatility
+
+
+async def fetch_ai_insight(investor_type: str, assets: list[str], prices: dict | None = None, use_cache: bool = True):
     """
     OpenRouter free-model fallback.
     Enforces: mentions investor_type verbatim + max 40 words.
+
+    prices: /simple/price-shaped data the caller already has; fetched via fetch_prices when omitted.
+    Insights are cached per (investor_type, asset set, market regime, UTC day), so users
+    with the same profile share one LLM call. use_cache=False forces a new one (refresh).
+    Otherwise a profile's last insight (INSIGHT_LAST_GOOD) is served while a new key is generated
+    in the background, and in place of a failed generation.
     """
     insight = {"source": "openrouter", "data": None, "error": None}
     openrouter_key = os.getenv("OPENROUTER_API_KEY")
@@ -527,50 +1339,18 @@ async def fetch_ai_insight(client: httpx.AsyncClient, investor_type: str, assets
         insight["data"] = "No AI key configured yet."
         return insight
 
-    assets_clean = [a.strip().lower() for a in (assets or []) if isinstance(a, str) and a.strip()][:12]
+    # Normalized (sorted, deduped) so identical profiles build identical prompts
+    assets_clean = sorted({a.strip().lower() for a in (assets or []) if isinstance(a, str) and a.strip()})[:12]
     investor_label = (investor_type or "").strip()
-
-    market_trend = "unknown"
-    btc_trend = "unknown"
-    volatility = "unknown"
     today_str = datetime.utcnow().strftime("%Y-%m-%d")
 
-    try:
-        if assets_clean:
-            base = coingecko_base_url()
-            mode = os.getenv("COINGECKO_MODE", "demo").lower()
-            cg_key = os.getenv("COINGECKO_API_KEY")
-
-            headers = {}
-            if cg_key:
-                headers["x-cg-demo-api-key"] = cg_key
-
-            r = await client.get(
-                f"{base}/simple/price",
-                params={"ids": ",".join(assets_clean), "vs_currencies": "usd", "include_24hr_change": "true"},
-                headers=headers,
-                timeout=15.0,
-            )
+    if prices is None and assets_clean:
+        prices = (await fetch_prices(assets_clean)).get("data")
+    market_trend, btc_trend, volatility = market_regime(prices or {}, assets_clean)
 
-            if r.status_code == 200:
-                data = r.json() or {}
-                changes = []
-                for a in assets_clean:
-                    ch = (data.get(a) or {}).get("usd_24h_change")
-                    if isinstance(ch, (int, float)):
-                        changes.append(float(ch))
-
-                if changes:
-                    avg = sum(changes) / len(changes)
-                    avg_abs = sum(abs(x) for x in changes) / len(changes)
-                    market_trend = "bullish" if avg > 0.6 else ("bearish" if avg < -0.6 else "sideways")
-                    volatility = "high" if avg_abs >= 6 else ("medium" if avg_abs >= 2.5 else "low")
-
-                btc_ch = (data.get("bitcoin") or {}).get("usd_24h_change")
-                if isinstance(btc_ch, (int, float)):
-                    btc_trend = "up" if btc_ch > 0.6 else ("down" if btc_ch < -0.6 else "flat")
-    except Exception:
-        pass
+    profile = (investor_label.lower(), tuple(assets_clean))
+    cache_key = profile + (market_trend, btc_trend, volatility, today_str)
+    flight_key = ("ai_insight",) + cache_key + (use_cache,)
 
     prompt = f"""
     You are a crypto market analyst.
@@ -594,6 +1374,35 @@ async def fetch_ai_insight(client: httpx.AsyncClient, investor_type: str, assets
     7) Max 40 words. Single paragraph only.
     """.strip()
 
+    async def generate():
+        result = await generate_ai_insight(openrouter_key, prompt, investor_label, market_trend, btc_trend, volatility)
+        if not result.get("error"):
+            INSIGHT_CACHE.set(cache_key, result["data"])
+            INSIGHT_LAST_GOOD.set(profile, (today_str, result["data"]))
+        return result
+
+    if use_cache:
+        cached = INSIGHT_CACHE.get(cache_key)
+        if cached is not None:
+            return {"source": "openrouter_cache", "data": cached, "error": None}
+        recent = INSIGHT_LAST_GOOD.get_with_age(profile)
+        if recent is not None and recent[0][0] == today_str:
+            revalidate(flight_key, generate)
+            return {"source": "openrouter_stale", "data": recent[0][1], "error": None, "stale": True}
+
+    result = await UPSTREAM_FLIGHTS.do(flight_key, generate)
+    # A refresh (use_cache=False) keeps its error, so the endpoint leaves the snapshot as it is
+    if result.get("error") and use_cache:
+        last = INSIGHT_LAST_GOOD.get_with_age(profile, stale=True)
+        if last is not None:
+            return {"source": "openrouter_stale", "data": last[0][1], "error": None, "stale": True}
+    return dict(result)
+
+
+async def generate_ai_insight(openrouter_key: str, prompt: str, investor_label: str,
+                              market_trend: str, btc_trend: str, volatility: str) -> dict:
+    insight = {"source": "openrouter", "data": None, "error": None}
+
     FREE_MODELS = [
         "meta-llama/llama-3.3-70b-instruct:free",
         "mistralai/mistral-7b-instruct:free",
@@ -602,8 +1411,8 @@ async def fetch_ai_insight(client: httpx.AsyncClient, investor_type: str, assets
 
     try:
         for model in FREE_MODELS:
-            ai = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
+            ai = await scheduled("openrouter", lambda model=model: get_client("openrouter").post(
+                f"{OPENROUTER_BASE_URL}/chat/completions",
                 headers={"Authorization": f"Bearer {openrouter_key}", "Content-Type": "application/json"},
                 json={
                     "model": model,
@@ -614,19 +1423,19 @@ async def fetch_ai_insight(client: httpx.AsyncClient, investor_type: str, assets
                     "temperature": 0.5,
                     "max_tokens": 160,
                 },
-                timeout=25.0,
-            )
+                extensions={"model": model},  # per-model upstream metrics
+            ))
 
             if ai.status_code != 200:
-                print("OpenRouter non-200:", ai.status_code, "model:", model)
+                log.warning("openrouter non-200", extra={"status": ai.status_code, "model": model})
                 continue
 
             j = ai.json() or {}
             txt = (j.get("choices", [{}])[0].get("message", {}).get("content") or "").strip()
             txt = re.sub(r"\s+", " ", txt).strip()
 
-            print("AI model used:", model)
-            print("AI Insight raw response:", repr(txt))
+            log.info("ai insight generated", extra={"model": model})
+            log.debug("ai insight raw response", extra={"model": model, "text": txt})
 
             if not txt:
                 continue
@@ -657,15 +1466,388 @@ async def fetch_ai_insight(client: httpx.AsyncClient, investor_type: str, assets
         return insight
 
 
-def generate_fun_section(_: dict):
-    moods = [
-        "Market mood: cautious optimism.",
-        "Market mood: leverage is creeping back.",
-        "Market mood: waiting for confirmation.",
-        "Market mood: everyone thinks they're early.",
-        "Market mood: low conviction, high noise.",
-    ]
-    facts = [
+def pending_section(name: str, timeout: float, error: str | None = None) -> dict:
+    """
+    Placeholder for a section that missed its deadline.
+    Keeps the usual {source, data, error} shape so the frontend renders it as-is.
+    schedule_completion() (or a /dashboard/refresh/{section}) fills it in; it is only persisted,
+    marked final, once complete_sections() gives up on the section.
+    """
+    empty_data = {
+        "prices": {},
+        "chart": {},
+        "news": [],
+        "ai_insight": "AI insight is still loading. Please refresh.",
+    }
+    section = {
+        "source": "pending",
+        "data": empty_data.get(name),
+        "error": error or f"{name} timed out after {timeout:g}s",
+        "pending": True,
+    }
+    if name == "chart":
+        section["range"] = "7d"
+    return section
+
+
+def _section_result(name: str, task: asyncio.Task, timeout: float):
+    exc = task.exception()
+    if isinstance(exc, asyncio.TimeoutError):
+        return pending_section(name, timeout)
+    if exc is not None:
+        return pending_section(name, timeout, error=str(exc))
+    return task.result()
+
+
+async def iter_sections(builders: dict, section_timeout: float, budget: float):
+    """
+    Runs section coroutines concurrently and yields (name, section) as each one completes.
+    Each section gets min(section_timeout, budget); whatever is still running when
+    the budget runs out is cancelled and yielded as pending_section().
+    """
+    timeout = max(0.0, min(section_timeout, budget))
+    tasks = {
+        asyncio.create_task(asyncio.wait_for(coro, timeout)): name
+        for name, coro in builders.items()
+    }
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + budget
+    pending = set(tasks)
+
+    def observe(name: str, section) -> tuple:
+        outcome = "pending" if isinstance(section, dict) and section.get("pending") else "ok"
+        SECTION_LATENCY.observe(loop.time() - started, section=name, outcome=outcome)
+        return name, section
+
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield observe(tasks[task], _section_result(tasks[task], task, timeout))
+
+        for task in pending:
+            task.cancel()
+            yield observe(tasks[task], pending_section(tasks[task], timeout))
+    finally:
+        # Consumer went away (e.g. stream client disconnected): don't leave fetches running
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def gather_sections(builders: dict, section_timeout: float, budget: float) -> dict:
+    """
+    Collects iter_sections() into {name: section}, in builder order.
+    """
+    results = {}
+    async for name, section in iter_sections(builders, section_timeout, budget):
+        results[name] = section
+
+    timed_out = [n for n, v in results.items() if isinstance(v, dict) and v.get("pending")]
+    if timed_out:
+        log.warning("sections past deadline", extra={"sections": timed_out})
+    return {name: results[name] for name in builders}
+
+
+async def get_feedback(user_id: int) -> Feedback | None:
+    """
+    Vote feedback for ranking: one indexed lookup on user_affinity per FEEDBACK_TTL
+    (plus the shared item scores once per ITEM_SCORES_TTL). None if it can't be loaded;
+    ranking then falls back to preferences only.
+    """
+    cached = FEEDBACK_CACHE.get(user_id)
+    if cached is not None:
+        return cached
+    try:
+        async with async_engine.connect() as conn:
+            items = ITEM_SCORES_CACHE.get("items")
+            if items is None:
+                items = await load_item_scores(conn)
+                ITEM_SCORES_CACHE.set("items", items)
+            affinity = await load_user_affinity(conn, user_id)
+    except Exception as e:
+        log.warning("feedback load failed", extra={"user_id": user_id, "error": str(e)})
+        return None
+    feedback = Feedback(user_id, affinity, items)
+    FEEDBACK_CACHE.set(user_id, feedback)
+    return feedback
+
+
+def news_limit_for(prefs: dict, feedback: Feedback | None = None) -> int:
+    # Keep total content tight when adding optional sections
+    content_types = set(prefs.get("content_type") or [])
+    limit = 5 - (1 if "charts" in content_types else 0) - (1 if "fun" in content_types else 0)
+    # Users who keep voting news up (or down) get one more (or one fewer) item
+    if feedback is not None:
+        affinity = feedback.section("news")
+        limit += 1 if affinity >= 3 else (-1 if affinity <= -3 else 0)
+    return max(2, min(6, limit))
+
+
+def cohort_key(prefs: dict, day_: date) -> tuple[str, date]:
+    """
+    Canonical hash of the normalized (investor_type, content types, assets) profile, plus the day.
+    """
+    investor_type, content, assets = profile_key(prefs)
+    raw = json.dumps([investor_type, sorted(content), sorted(assets)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20], day_
+
+
+def cohort_template(key: tuple) -> dict:
+    """
+    The cohort's template, or a new empty one; it's only stored once a section is added to it.
+    """
+    template = COHORT_CACHE.get(key)
+    return {} if template is None else template
+
+
+def section_incomplete(section) -> bool:
+    if not isinstance(section, dict) or section.get("final"):
+        return False
+    return bool(section.get("pending") or (section.get("error") and not section.get("data")))
+
+
+async def cohort_section(key: tuple, template: dict, name: str, coro):
+    """
+    Runs a cohort section builder and keeps a complete, fresh result in the template
+    (pending, failed and last-known-good sections are left for the next member to retry).
+    """
+    section = await coro
+    if not section_incomplete(section) and not (isinstance(section, dict) and section.get("stale")):
+        template[name] = section
+        stored = COHORT_CACHE.get(key)
+        if stored is None:
+            COHORT_CACHE.set(key, template)
+        elif stored is not template:
+            # Another member stored the cohort's template first
+            stored[name] = section
+    return section
+
+
+def cohort_stats() -> dict:
+    served = {"template": 0, "built": 0}
+    for name in COHORT_SECTIONS:
+        for source in served:
+            served[source] += COHORT_SECTIONS_SERVED.value(section=name, source=source)
+    total = served["template"] + served["built"]
+    return {
+        "cohorts": len(COHORT_CACHE.ages()),
+        "ttl": COHORT_TTL,
+        "sections_from_template": served["template"],
+        "sections_built": served["built"],
+        "reuse_ratio": round(served["template"] / total, 3) if total else None,
+    }
+
+
+def section_builders(prefs: dict, feedback: Feedback | None = None) -> tuple[dict, dict]:
+    """
+    Real-mode sections for a cold build: ({name: coroutine} for upstream-backed sections,
+    {name: section} for the ones computed locally or taken from the cohort template).
+    Cohort sections come from the template when another member built them today; news stays
+    per user (ranked with the user's feedback over the shared feed), as do meme and fun.
+    """
+    asset_ids = [str(x).strip().lower() for x in (prefs.get("crypto_assets") or []) if str(x).strip()]
+    investor_type = prefs.get("investor_type") or ""
+    content_types = set(prefs.get("content_type") or [])
+    key = cohort_key(prefs, datetime.utcnow().date())
+    template = cohort_template(key)
+
+    wanted = ["prices", "ai_insight"] + (["chart"] if "charts" in content_types else [])
+    local = {}
+    for name in wanted:
+        if name in template:
+            local[name] = template[name]
+        COHORT_SECTIONS_SERVED.inc(section=name, source="template" if name in template else "built")
+
+    builders = {}
+    if "prices" not in local or "ai_insight" not in local:
+        # The insight reuses the prices section's payload instead of fetching its own.
+        # shield(): a prices deadline must not cancel the fetch the insight is still waiting on.
+        if "prices" in local:
+            prices_task = asyncio.get_running_loop().create_future()
+            prices_task.set_result(local["prices"])
+        else:
+            prices_task = asyncio.create_task(cohort_section(key, template, "prices", fetch_prices(asset_ids)))
+            builders["prices"] = asyncio.shield(prices_task)
+
+        async def build_insight():
+            prices = await asyncio.shield(prices_task)
+            return await fetch_ai_insight(investor_type, asset_ids, prices=prices.get("data"))
+
+        if "ai_insight" not in local:
+            builders["ai_insight"] = cohort_section(key, template, "ai_insight", build_insight())
+
+    builders["news"] = fetch_news(prefs, limit=news_limit_for(prefs, feedback), feedback=feedback)
+    if "charts" in content_types and "chart" not in local:
+        builders["chart"] = cohort_section(key, template, "chart", fetch_price_chart(asset_ids, days=7))
+
+    local["meme"] = pick_meme(prefs, feedback=feedback)
+    if "fun" in content_types:
+        local["fun"] = generate_fun_section(prefs)
+
+    return builders, local
+
+
+def expected_sections(prefs: dict) -> list[str]:
+    content_types = set(prefs.get("content_type") or [])
+    return (["prices", "ai_insight", "news", "meme"] + (["chart"] if "charts" in content_types else [])
+            + (["fun"] if "fun" in content_types else []))
+
+
+def completed_sections(sections: dict) -> dict:
+    """
+    The sections of a build that may be persisted (pending and failed ones are retried later).
+    """
+    return {name: section for name, section in sections.items() if not section_incomplete(section)}
+
+
+def with_placeholders(prefs: dict, sections: dict) -> tuple[dict, list[str]]:
+    """
+    A persisted snapshot plus pending_section() for the sections it doesn't have yet.
+    """
+    missing = [name for name in expected_sections(prefs) if name not in sections]
+    if not missing:
+        return sections, []
+    return {**sections, **{name: pending_section(name, DASHBOARD_SECTION_TIMEOUT) for name in missing}}, missing
+
+
+async def complete_sections(user_id: int, day_: date, prefs: dict, dashboard_id: int, names: list[str]):
+    """
+    Rebuilds sections a snapshot was persisted without and adds the ones that complete.
+    A section still failing on its PENDING_MAX_ATTEMPTS-th retry is added with its last error
+    ("final": true), so the snapshot stops being served with placeholders and retried.
+    """
+    assets = [str(x).strip().lower() for x in (prefs.get("crypto_assets") or []) if str(x).strip()]
+    feedback = await get_feedback(user_id)
+
+    async def ready(section):
+        return section
+
+    async def build_insight():
+        prices = await fetch_prices(assets)
+        return await fetch_ai_insight(prefs.get("investor_type") or "", assets, prices=prices.get("data"))
+
+    makers = {
+        "prices": lambda: fetch_prices(assets),
+        "ai_insight": build_insight,
+        "news": lambda: fetch_news(prefs, limit=news_limit_for(prefs, feedback), feedback=feedback),
+        "chart": lambda: fetch_price_chart(assets, days=7),
+        "meme": lambda: ready(pick_meme(prefs, feedback=feedback)),
+        "fun": lambda: ready(generate_fun_section(prefs)),
+    }
+    builders = {name: makers[name]() for name in names if name in makers}
+    with upstream_lane(REFRESH):
+        sections = await gather_sections(builders, PENDING_SECTION_TIMEOUT, PENDING_SECTION_TIMEOUT)
+    done = completed_sections(sections)
+    given_up = []
+    for name, section in sections.items():
+        if name in done:
+            continue
+        attempts = (SECTION_ATTEMPTS.get((dashboard_id, name)) or 0) + 1
+        SECTION_ATTEMPTS.set((dashboard_id, name), attempts)
+        if attempts >= PENDING_MAX_ATTEMPTS:
+            done[name] = {**section, "pending": False, "final": True}
+            given_up.append(name)
+    if done:
+        async with async_engine.begin() as conn:
+            for name, section in done.items():
+                await add_snapshot_section(conn, user_id, day_, dashboard_id, name, section)
+    log.info("pending sections completed", extra={
+        "user_id": user_id, "dashboard_id": dashboard_id, "completed": sorted(set(done) - set(given_up)),
+        "given_up": sorted(given_up), "still_pending": sorted(set(names) - set(done)),
+    })
+
+
+def schedule_completion(user_id: int, day_: date, prefs: dict, dashboard_id: int, names: list[str]):
+    """
+    Starts complete_sections() in the background unless one ran for this user/day recently.
+    """
+    key = (user_id, day_)
+    if not names or DEV_MODE or key in COMPLETION_TASKS or SECTION_COMPLETIONS.get(key) is not None:
+        return
+    SECTION_COMPLETIONS.set(key, time.time())
+
+    async def run():
+        try:
+            await complete_sections(user_id, day_, prefs, dashboard_id, names)
+        except Exception as e:
+            log.warning("pending section completion failed", extra={"user_id": user_id, "error": str(e)})
+
+    task = asyncio.create_task(run())
+    COMPLETION_TASKS[key] = task
+    task.add_done_callback(lambda _: COMPLETION_TASKS.pop(key, None))
+
+
+def mock_sections(prefs: dict, today: date) -> dict:
+    """
+    DEV_MODE: fast mock sections without external calls.
+    """
+    sections = {
+        "prices": {
+            "source": "mock",
+            "data": {
+                "bitcoin": {"usd": 65000, "usd_24h_change": 1.24},
+                "ethereum": {"usd": 3200, "usd_24h_change": -0.62},
+            },
+            "error": None,
+        },
+        "news": {
+            "source": "mock",
+            "data": [
+                {"id": stable_news_id("mock", "Bitcoin holds steady as volatility drops", str(today)), "title": "Bitcoin holds steady as volatility drops", "published_at": str(today)},
+                {"id": stable_news_id("mock", "ETH staking demand rises ahead of upgrade rumors", str(today)), "title": "ETH staking demand rises ahead of upgrade rumors", "published_at": str(today)},
+            ],
+            "error": None,
+        },
+        "ai_insight": {
+            "source": "mock",
+            "data": "Keep risk controlled. Scale in slowly, avoid chasing candles.",
+            "error": None,
+        },
+        "meme": pick_meme(prefs),
+    }
+
+    if "charts" in prefs.get("content_type", []):
+        now_ms = int(datetime.utcnow().timestamp() * 1000)
+        day_ms = 24 * 60 * 60 * 1000
+        ids = (prefs.get("crypto_assets") or ["bitcoin", "ethereum"])[:4]
+
+        data = {}
+        base = 100.0
+        for i, cid in enumerate(ids):
+            series = []
+            v = base + i * 25
+            for k in range(7):
+                v = v * (1 + (random.random() - 0.5) * 0.02)
+                series.append([now_ms - (6 - k) * day_ms, round(v, 2)])
+            data[cid] = series
+
+        sections["chart"] = {
+            "source": "mock",
+            "range": "7d",
+            "data": data,
+            "error": None,
+        }
+
+    if "fun" in prefs.get("content_type", []):
+        sections["fun"] = generate_fun_section(prefs)
+
+    return sections
+
+
+def generate_fun_section(_: dict):
+    moods = [
+        "Market mood: cautious optimism.",
+        "Market mood: leverage is creeping back.",
+        "Market mood: waiting for confirmation.",
+        "Market mood: everyone thinks they're early.",
+        "Market mood: low conviction, high noise.",
+    ]
+    facts = [
         "Most traders lose money not on bad entries – but bad exits.",
         "High volatility days statistically favor patient traders.",
         "Big moves often start when sentiment is most divided.",
@@ -674,12 +1856,386 @@ def generate_fun_section(_: dict):
     return {"type": "fun", "variant": "daily_fun", "text": random.choice(moods + facts)}
 
 
+# =========================================================
+# Background market data ingestion
+# =========================================================
+MARKET_INGEST_STATUS = {
+    "leader": False,
+    "last_run_at": None,
+    "last_duration_s": None,
+    "coins": 0,
+    "chart_coins": 0,
+    "last_chart_run_at": None,
+    "errors": [],
+}
+
+
+def load_tracked_assets() -> tuple[list[str], list[str]]:
+    """
+    Union of crypto_assets across all users, plus the subset needed for charts.
+    """
+    all_q = text("SELECT DISTINCT jsonb_array_elements_text(crypto_assets) FROM user_preferences")
+    chart_q = text("""
+        SELECT DISTINCT jsonb_array_elements_text(crypto_assets)
+        FROM user_preferences
+        WHERE content_type @> CAST('["charts"]' AS jsonb)
+    """)
+    with engine.connect() as conn:
+        coins = [str(r[0]).strip().lower() for r in conn.execute(all_q).fetchall() if r[0]]
+        chart_coins = [str(r[0]).strip().lower() for r in conn.execute(chart_q).fetchall() if r[0]]
+    return sorted(set(coins)), sorted(set(chart_coins))
+
+
+async def run_market_ingest(include_charts: bool):
+    """
+    One ingestion pass: prices in maximal /simple/price batches, then 7d charts.
+    Entries outlive the interval so readers never fall back to upstream between passes.
+    """
+    started = time.time()
+    errors = []
+    coins, chart_coins = await asyncio.to_thread(load_tracked_assets)
+
+    price_ttl = max(PRICE_TTL, 2 * MARKET_INGEST_INTERVAL)
+    for i in range(0, len(coins), MARKET_INGEST_BATCH):
+        batch = coins[i:i + MARKET_INGEST_BATCH]
+        try:
+            _, error = await update_price_cache(batch, ttl=price_ttl)
+            if error:
+                errors.append(f"simple/price: {error}")
+        except Exception as e:
+            errors.append(f"simple/price: {e}")
+
+    if include_charts:
+        chart_ttl = max(CHART_TTL, 2 * MARKET_CHART_INGEST_INTERVAL)
+        for cid in chart_coins:
+            try:
+                r = await get_market_chart(cid, 7)
+                if r.status_code != 200:
+                    errors.append(f"market_chart {cid} status {r.status_code}")
+                    continue
+                series = chart_series_from_response(r)
+                if series:
+                    CHART_CACHE.set((cid, 7), series, ttl=chart_ttl)
+            except Exception as e:
+                errors.append(f"market_chart {cid}: {e}")
+        MARKET_INGEST_STATUS["last_chart_run_at"] = datetime.utcnow().isoformat() + "Z"
+
+    MARKET_INGEST_STATUS.update({
+        "last_run_at": datetime.utcnow().isoformat() + "Z",
+        "last_duration_s": round(time.time() - started, 3),
+        "coins": len(coins),
+        "chart_coins": len(chart_coins),
+        "errors": errors[:10],
+    })
+
+
+async def hold_ingest_lock(lock_conn):
+    """
+    Returns the connection holding MARKET_INGEST_LOCK_KEY for this worker (taking the lock if
+    it's free), or None while another worker holds it. A lock whose connection broke is gone.
+    """
+    if lock_conn is not None:
+        try:
+            await lock_conn.execute(text("SELECT 1"))
+            await lock_conn.commit()
+            return lock_conn
+        except Exception as e:
+            log.warning("market ingest lock lost", extra={"error": str(e)})
+            await lock_conn.invalidate()
+            await lock_conn.close()
+
+    lock_conn = await async_engine.connect()
+    try:
+        locked = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MARKET_INGEST_LOCK_KEY})).scalar()
+        # Session-level lock: it outlives the transaction, which mustn't stay open between passes
+        await lock_conn.commit()
+    except Exception:
+        await lock_conn.close()
+        raise
+    if locked:
+        log.info("market ingest lock acquired")
+        return lock_conn
+    await lock_conn.close()
+    return None
+
+
+async def market_ingest_loop():
+    last_chart_run = 0.0
+    lock_conn = None
+    # Background lane: ingest calls queue behind interactive requests for the CoinGecko quota
+    with upstream_lane(BACKGROUND):
+        try:
+            while True:
+                include_charts = time.time() - last_chart_run >= MARKET_CHART_INGEST_INTERVAL
+                try:
+                    lock_conn = await hold_ingest_lock(lock_conn)
+                    MARKET_INGEST_STATUS["leader"] = lock_conn is not None
+                    if lock_conn is not None:
+                        await run_market_ingest(include_charts)
+                        if include_charts:
+                            last_chart_run = time.time()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.error("market ingest failed", extra={"error": str(e)})
+                await asyncio.sleep(MARKET_INGEST_INTERVAL)
+        finally:
+            MARKET_INGEST_STATUS["leader"] = False
+            if lock_conn is not None:
+                try:
+                    await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MARKET_INGEST_LOCK_KEY})
+                    await lock_conn.commit()
+                finally:
+                    await lock_conn.close()
+
+
+def market_store_report() -> dict:
+    """
+    Staleness (age in seconds) of every price and chart entry in the in-process store.
+    """
+    return {
+        "ingest": {**MARKET_INGEST_STATUS, "enabled": MARKET_INGEST_ENABLED, "interval_s": MARKET_INGEST_INTERVAL},
+        "prices": PRICE_CACHE.ages(),
+        "charts": {f"{cid}:{days}d": age for (cid, days), age in CHART_CACHE.ages().items()},
+    }
+
+
+# =========================================================
+# Next-day snapshot prewarming
+# =========================================================
+PREWARM_STATUS = {
+    "day": None,
+    "started_at": None,
+    "built_at": None,
+    "finished_at": None,
+    "candidates": 0,
+    "outcomes": {},
+    "inputs": {},
+    "errors": [],
+}
+
+
+async def load_prewarm_candidates(conn, day_: date) -> list[tuple[int, dict]]:
+    """
+    (user_id, prefs) for onboarded users with a snapshot in the last PREWARM_ACTIVE_DAYS days
+    and none for day_ yet, ordered so that users with the same profile are adjacent.
+    """
+    q = text("""
+        SELECT p.user_id, p.crypto_assets, p.investor_type, p.content_type
+        FROM user_preferences p
+        WHERE EXISTS (
+            SELECT 1 FROM daily_dashboard d
+            WHERE d.user_id = p.user_id AND d.day >= :since AND d.day < :day
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM daily_dashboard d WHERE d.user_id = p.user_id AND d.day = :day
+        )
+        ORDER BY p.user_id
+        LIMIT :limit
+    """)
+    rows = (await conn.execute(q, {
+        "since": day_ - timedelta(days=PREWARM_ACTIVE_DAYS),
+        "day": day_,
+        "limit": PREWARM_MAX_USERS,
+    })).fetchall()
+    users = [(int(r.user_id), _prefs_from_row(r)) for r in rows]
+    users.sort(key=lambda u: (u[1]["investor_type"] or "", sorted(map(str, u[1]["crypto_assets"]))))
+    return users
+
+
+async def warm_prices(coins: list[str], errors: list[str]):
+    for i in range(0, len(coins), MARKET_INGEST_BATCH):
+        try:
+            _, error = await update_price_cache(coins[i:i + MARKET_INGEST_BATCH])
+            if error:
+                errors.append(f"simple/price: {error}")
+        except Exception as e:
+            errors.append(f"simple/price: {e}")
+
+
+async def warm_shared_inputs(users: list[tuple[int, dict]], errors: list[str]) -> dict:
+    """
+    Fetches what the users' sections share, once: all their coins in /simple/price batches,
+    7d charts for the union of chart users' coins, and the news feed.
+    """
+    coins, chart_coins = set(), set()
+    for _, prefs in users:
+        ids = {str(x).strip().lower() for x in (prefs.get("crypto_assets") or []) if str(x).strip()}
+        coins |= ids
+        if "charts" in set(prefs.get("content_type") or []):
+            chart_coins |= ids
+
+    await warm_prices(sorted(coins), errors)
+    if chart_coins:
+        chart = await fetch_price_chart(sorted(chart_coins), days=7)
+        if chart.get("error"):
+            errors.append(f"market_chart: {chart['error']}")
+    news = "skipped"
+    token = os.getenv("CRYPTOPANIC_TOKEN")
+    if token:
+        try:
+            await get_news_feed(token)
+            news = "ok"
+        except Exception as e:
+            news = "failed"
+            errors.append(f"news: {e}")
+    return {"coins": len(coins), "chart_coins": len(chart_coins), "news": news}
+
+
+async def prewarm_user(user_id: int, prefs: dict, day_: date) -> str:
+    """
+    Builds and persists the day's snapshot like a cold GET /dashboard would. Snapshots with
+    a pending or failed section are not persisted: the user's own first load retries them.
+    """
+    builders, local = section_builders(prefs, await get_feedback(user_id))
+    sections = await gather_sections(builders, DASHBOARD_SECTION_TIMEOUT, DASHBOARD_BUILD_BUDGET)
+    sections.update(local)
+    if any(section_incomplete(v) for v in sections.values()):
+        return "incomplete"
+
+    async with async_engine.begin() as conn:
+        # The user may have loaded the dashboard themselves since the candidates were listed
+        exists = (await conn.execute(
+            text("SELECT 1 FROM daily_dashboard WHERE user_id = :user_id AND day = :day LIMIT 1"),
+            {"user_id": user_id, "day": day_},
+        )).first()
+        if exists:
+            return "exists"
+        await save_daily_dashboard(conn, user_id, day_, sections)
+    return "prewarmed"
+
+
+async def sleep_until(when: datetime):
+    delay = (when - datetime.utcnow()).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def run_prewarm(rollover: datetime):
+    """
+    One prewarm for the day starting at `rollover` (naive UTC midnight). Called up to
+    PREWARM_LEAD_S before it; returns once every candidate is done or the window has passed.
+    """
+    day_ = rollover.date()
+    errors: list[str] = []
+    outcomes: dict[str, int] = {}
+
+    async with async_engine.connect() as lock_conn:
+        locked = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": PREWARM_LOCK_KEY})).scalar()
+        if not locked:
+            log.info("prewarm skipped, another worker holds the lock", extra={"day": str(day_)})
+            return
+        try:
+            async with async_engine.connect() as conn:
+                users = await load_prewarm_candidates(conn, day_)
+            PREWARM_STATUS.update({
+                "day": str(day_),
+                "started_at": datetime.utcnow().isoformat() + "Z",
+                "built_at": None,
+                "finished_at": None,
+                "candidates": len(users),
+                "outcomes": outcomes,
+                "inputs": {},
+                "errors": [],
+            })
+            log.info("prewarm started", extra={"day": str(day_), "candidates": len(users)})
+            if not users:
+                return
+
+            # Before the rollover: charts and news are fetched now and are still fresh at midnight
+            PREWARM_STATUS["inputs"] = await warm_shared_inputs(users, errors)
+            await sleep_until(rollover + timedelta(seconds=1))
+
+            # After it: prices moved, so one more batched pass, kept warm while the snapshots are built
+            # (the market ingest already does this when it runs in this worker)
+            keep_warm = None
+            if not MARKET_INGEST_STATUS["leader"]:
+                coins = sorted({str(x).strip().lower() for _, p in users for x in (p.get("crypto_assets") or []) if str(x).strip()})
+
+                async def keep_prices_warm():
+                    while True:
+                        await warm_prices(coins, errors)
+                        await asyncio.sleep(PRICE_TTL / 2)
+
+                keep_warm = asyncio.create_task(keep_prices_warm())
+
+            deadline = rollover + timedelta(seconds=PREWARM_WINDOW_S)
+            sem = asyncio.Semaphore(max(1, PREWARM_CONCURRENCY))
+
+            async def build(user_id: int, prefs: dict):
+                async with sem:
+                    if datetime.utcnow() >= deadline:
+                        outcome = "deferred"
+                    else:
+                        try:
+                            outcome = await prewarm_user(user_id, prefs, day_)
+                        except Exception as e:
+                            outcome = "failed"
+                            errors.append(f"user {user_id}: {e}")
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                DASHBOARD_PREWARMS.inc(outcome=outcome)
+
+            try:
+                await asyncio.gather(*(build(u, p) for u, p in users))
+            finally:
+                if keep_warm is not None:
+                    keep_warm.cancel()
+            PREWARM_STATUS["built_at"] = datetime.utcnow().isoformat() + "Z"
+        finally:
+            PREWARM_STATUS["errors"] = errors[:10]
+            PREWARM_STATUS["finished_at"] = datetime.utcnow().isoformat() + "Z"
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PREWARM_LOCK_KEY})
+
+    log.info("prewarm finished", extra={"day": str(day_), **outcomes})
+
+
+async def prewarm_loop():
+    # Background lane: prewarm calls only use upstream quota that page loads leave over
+    with upstream_lane(BACKGROUND):
+        while True:
+            now = datetime.utcnow()
+            rollover = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await sleep_until(rollover - timedelta(seconds=PREWARM_LEAD_S))
+            try:
+                await run_prewarm(rollover)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("prewarm failed", extra={"error": str(e)})
+            # Once per rollover, even if the run ended before midnight
+            await sleep_until(rollover + timedelta(seconds=1))
+
+
 # =========================================================
 # Auth endpoints
 # =========================================================
+async def run_password_job(job):
+    """
+    Awaits a bcrypt job; maps a saturated hasher pool to 503 + Retry-After.
+    """
+    try:
+        return await job
+    except PasswordHasherBusy as e:
+        raise HTTPException(503, "Server busy, please retry", headers={"Retry-After": str(e.retry_after)})
+
+
+async def rehash_password(user_id: int, password: str):
+    """
+    Upgrades a stored hash to the current BCRYPT_ROUNDS after a successful login.
+    Best effort: skipped when the hasher pool is busy.
+    """
+    try:
+        new_hash = await hash_password(password)
+    except PasswordHasherBusy:
+        return
+    q = text("UPDATE users SET password_hash = :password_hash WHERE id = :id")
+    async with async_engine.begin() as conn:
+        await conn.execute(q, {"password_hash": new_hash, "id": user_id})
+
+
 @app.post("/auth/signup")
-def signup(data: SignupReq):
-    hashed_password = bcrypt.hashpw(data.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+async def signup(data: SignupReq):
+    hashed_password = await run_password_job(hash_password(data.password))
 
     query = text("""
         INSERT INTO users (name, email, password_hash)
@@ -688,12 +2244,12 @@ def signup(data: SignupReq):
     """)
 
     try:
-        with engine.begin() as conn:
-            user_id = conn.execute(query, {
+        async with async_engine.begin() as conn:
+            user_id = (await conn.execute(query, {
                 "name": data.name,
                 "email": data.email,
                 "password_hash": hashed_password,
-            }).scalar()
+            })).scalar()
     except Exception:
         # Keep simple; you can tighten later with IntegrityError if you want
         raise HTTPException(409, "User already exists")
@@ -709,37 +2265,38 @@ def signup(data: SignupReq):
 
 
 @app.post("/auth/login")
-def login(data: LoginReq):
+async def login(data: LoginReq, background_tasks: BackgroundTasks):
     query = text("SELECT id, password_hash FROM users WHERE email = :email")
 
-    with engine.connect() as conn:
-        user = conn.execute(query, {"email": data.email}).fetchone()
+    async with async_engine.connect() as conn:
+        user = (await conn.execute(query, {"email": data.email})).fetchone()
 
     if user is None:
         raise HTTPException(401, "Invalid email or password")
 
     user_id, password_hash = user
-    valid = bcrypt.checkpw(data.password.encode("utf-8"), password_hash.encode("utf-8"))
+    valid = await run_password_job(verify_password(data.password, password_hash))
     if not valid:
         raise HTTPException(401, "Invalid email or password")
 
+    # Stored with a different cost than BCRYPT_ROUNDS: rehash after the response is sent
+    if needs_rehash(password_hash):
+        background_tasks.add_task(rehash_password, int(user_id), data.password)
+
     token = create_access_token(int(user_id))
     return {"access_token": token, "token_type": "bearer"}
 
 
 @app.get("/me")
-def me(user_id: int = Depends(get_user_id)):
-    user_q = text("SELECT id, name, email FROM users WHERE id = :id")
-    pref_q = text("SELECT 1 FROM user_preferences WHERE user_id = :id LIMIT 1")
+async def me(user_id: int = Depends(get_user_id)):
+    async with async_engine.connect() as conn:
+        ctx = await load_user_context(conn, user_id, datetime.utcnow().date(), include_snapshot=False)
 
-    with engine.connect() as conn:
-        user = conn.execute(user_q, {"id": user_id}).fetchone()
-        has_pref = conn.execute(pref_q, {"id": user_id}).fetchone() is not None
-
-    if user is None:
+    if ctx is None:
         raise HTTPException(401, "User not found")
 
-    return {"id": user.id, "name": user.name, "email": user.email, "needsOnboarding": (not has_pref)}
+    user = ctx["user"]
+    return {"id": user["id"], "name": user["name"], "email": user["email"], "needsOnboarding": ctx["preferences"] is None}
 
 
 # =========================================================
@@ -795,8 +2352,8 @@ async def save_onboarding(data: OnboardingReq, user_id: int = Depends(get_user_i
     """)
 
     try:
-        with engine.begin() as conn:
-            conn.execute(q, {
+        async with async_engine.begin() as conn:
+            await conn.execute(q, {
                 "user_id": user_id,
                 "crypto_assets": json.dumps(resolved_ids),
                 "investor_type": data.investor_type,
@@ -811,210 +2368,388 @@ async def save_onboarding(data: OnboardingReq, user_id: int = Depends(get_user_i
 # =========================================================
 # Dashboard
 # =========================================================
+def cache_dashboard_response(user_id: int, day_: date, prefs: dict, dashboard_id: int, sections: dict,
+                             cache: bool = True) -> tuple:
+    """
+    Serializes the GET /dashboard body once and keeps it in SNAPSHOT_CACHE.
+    cache=False for bodies with pending placeholders, so loads re-read the snapshot until it's complete.
+    """
+    body = json.dumps({"preferences": prefs, "dashboard_id": dashboard_id, "sections": sections}).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    entry = (dashboard_id, body, etag)
+    if cache:
+        SNAPSHOT_CACHE.set((user_id, day_), entry)
+    return entry
+
+
+def with_votes(entry: tuple, votes: list[dict]) -> tuple:
+    """
+    Adds "votes" to a cached body by splicing bytes, so the sections aren't re-encoded.
+    """
+    dashboard_id, body, etag = entry
+    votes_json = json.dumps(votes).encode("utf-8")
+    body = body[:-1] + b', "votes": ' + votes_json + b"}"
+    etag = '"' + hashlib.sha256(etag.encode("utf-8") + votes_json).hexdigest()[:32] + '"'
+    return dashboard_id, body, etag
+
+
+def snapshot_line(entry: tuple) -> bytes:
+    """
+    The cached GET /dashboard body as one /dashboard/stream "snapshot" event, spliced, not re-encoded.
+    """
+    return b'{"event": "snapshot", "cached": true, ' + entry[1][1:] + b"\n"
+
+
+def etag_response(request: Request, entry: tuple) -> Response:
+    _, body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def overloaded_error(e: Overloaded) -> HTTPException:
+    return HTTPException(503, "Server busy, please retry", headers={"Retry-After": str(e.retry_after)})
+
+
+async def load_fallback_dashboard(user_id: int, include_votes: bool):
+    """
+    Latest persisted snapshot (possibly an earlier day's) and its votes, for shed builds.
+    """
+    async with async_engine.connect() as conn:
+        latest = await load_latest_snapshot(conn, user_id)
+        if latest is not None and include_votes:
+            latest["votes"] = await load_snapshot_votes(conn, user_id, latest["dashboard_id"])
+    return latest
+
+
 @app.get("/dashboard")
-async def dashboard(user_id: int = Depends(get_user_id)):
-    with engine.connect() as conn:
-        prefs = load_user_preferences(conn, user_id)
-    if prefs is None:
-        raise HTTPException(400, "Onboarding not completed")
+async def dashboard(request: Request, include_votes: bool = False, user_id: int = Depends(get_user_id)):
+    """
+    include_votes=true adds the snapshot's votes ([{section, item, value}]) so the page
+    doesn't need a separate GET /votes.
 
+    Cold builds go through BUILD_ADMISSION. When it sheds the request, the latest persisted
+    snapshot is served instead, marked "stale" with its "day" (503 + Retry-After if there is none).
+    """
     today = datetime.utcnow().date()
 
+    # Repeat loads: serve the serialized snapshot (or 304) without Postgres or the JSON encoder
+    cached = SNAPSHOT_CACHE.get((user_id, today))
+    if cached is not None:
+        DASHBOARD_LOADS.inc(endpoint="dashboard", source="cache")
+        if not include_votes:
+            return etag_response(request, cached)
+        async with async_engine.connect() as conn:
+            votes = await load_snapshot_votes(conn, user_id, cached[0])
+        return etag_response(request, with_votes(cached, votes))
+
+    async with async_engine.connect() as conn:
+        ctx = await load_user_context(conn, user_id, today, include_votes=include_votes)
+    prefs = ctx["preferences"] if ctx else None
+    if prefs is None:
+        raise HTTPException(400, "Onboarding not completed")
 
-    with engine.connect() as conn:
-        existing = load_daily_dashboard(conn, user_id, today)
-    print(f"[DASHBOARD] user={user_id} day={today} existing={'yes' if existing else 'no'} at={datetime.utcnow().isoformat()}Z")
+    existing = ctx["dashboard"]
+    DASHBOARD_LOADS.inc(endpoint="dashboard", source="snapshot" if existing else "rebuild")
+    log.info("dashboard load", extra={"user_id": user_id, "day": str(today), "existing": existing is not None})
 
     if existing is not None:
-        return {"preferences": prefs, "dashboard_id": existing["dashboard_id"], "sections": existing["sections"]}
-    print("[DASHBOARD] building sections from external APIs (no DB snapshot yet)")
-
+        sections, missing = with_placeholders(prefs, existing["sections"])
+        schedule_completion(user_id, today, prefs, existing["dashboard_id"], missing)
+        entry = cache_dashboard_response(user_id, today, prefs, existing["dashboard_id"], sections, cache=not missing)
+        return etag_response(request, with_votes(entry, ctx["votes"]) if include_votes else entry)
 
     # DEV_MODE: return fast mock without external calls
     if DEV_MODE:
-        sections = {
-            "prices": {
-                "source": "mock",
-                "data": {
-                    "bitcoin": {"usd": 65000, "usd_24h_change": 1.24},
-                    "ethereum": {"usd": 3200, "usd_24h_change": -0.62},
-                },
-                "error": None,
-            },
-            "news": {
-                "source": "mock",
-                "data": [
-                    {"id": stable_news_id("mock", "Bitcoin holds steady as volatility drops", str(today)), "title": "Bitcoin holds steady as volatility drops", "published_at": str(today)},
-                    {"id": stable_news_id("mock", "ETH staking demand rises ahead of upgrade rumors", str(today)), "title": "ETH staking demand rises ahead of upgrade rumors", "published_at": str(today)},
-                ],
-                "error": None,
-            },
-            "ai_insight": {
-                "source": "mock",
-                "data": "Keep risk controlled. Scale in slowly, avoid chasing candles.",
-                "error": None,
-            },
-            "meme": pick_meme(prefs),
-        }
-
-        if "charts" in prefs.get("content_type", []):
-            now_ms = int(datetime.utcnow().timestamp() * 1000)
-            day_ms = 24 * 60 * 60 * 1000
-            ids = (prefs.get("crypto_assets") or ["bitcoin", "ethereum"])[:4]
-
-            data = {}
-            base = 100.0
-            for i, cid in enumerate(ids):
-                series = []
-                v = base + i * 25
-                for k in range(7):
-                    v = v * (1 + (random.random() - 0.5) * 0.02)
-                    series.append([now_ms - (6 - k) * day_ms, round(v, 2)])
-                data[cid] = series
-
-            sections["chart"] = {
-                "source": "mock",
-                "range": "7d",
-                "data": data,
-                "error": None,
+        sections = mock_sections(prefs, today)
+    else:
+        try:
+            async with BUILD_ADMISSION.admit():
+                builders, local = section_builders(prefs, await get_feedback(user_id))
+                sections = await gather_sections(builders, DASHBOARD_SECTION_TIMEOUT, DASHBOARD_BUILD_BUDGET)
+                sections.update(local)
+        except Overloaded as e:
+            latest = await load_fallback_dashboard(user_id, include_votes)
+            if latest is None:
+                raise overloaded_error(e)
+            DASHBOARD_LOADS.inc(endpoint="dashboard", source="fallback")
+            log.warning("dashboard build shed", extra={"user_id": user_id, "fallback_day": str(latest["day"])})
+            body = {
+                "preferences": prefs,
+                "dashboard_id": latest["dashboard_id"],
+                "sections": latest["sections"],
+                "stale": True,
+                "day": str(latest["day"]),
             }
+            if include_votes:
+                body["votes"] = latest["votes"]
+            return JSONResponse(body, headers={"Cache-Control": "no-store"})
 
-        if "fun" in prefs.get("content_type", []):
-            sections["fun"] = generate_fun_section(prefs)
+    # Pending/failed sections are served as placeholders but not persisted; they're completed in the background
+    async with async_engine.begin() as conn:
+        dashboard_id = await save_daily_dashboard(conn, user_id, today, completed_sections(sections))
+    missing = [name for name, section in sections.items() if section_incomplete(section)]
+    schedule_completion(user_id, today, prefs, dashboard_id, missing)
 
-        with engine.begin() as conn:
-            dashboard_id = save_daily_dashboard(conn, user_id, today, sections)
+    entry = cache_dashboard_response(user_id, today, prefs, dashboard_id, sections, cache=not missing)
+    # A brand-new snapshot has no votes yet
+    return etag_response(request, with_votes(entry, []) if include_votes else entry)
 
-        return {"preferences": prefs, "dashboard_id": dashboard_id, "sections": sections}
 
-    # Real mode
-    asset_ids = [str(x).strip().lower() for x in (prefs.get("crypto_assets") or []) if str(x).strip()]
-    investor_type = prefs.get("investor_type") or ""
-    content_types = set(prefs.get("content_type") or [])
+@app.get("/dashboard/stream")
+async def dashboard_stream(include_votes: bool = False, user_id: int = Depends(get_user_id)):
+    """
+    Streaming variant of GET /dashboard (NDJSON, one event per line). A persisted snapshot is a
+    single line, served from SNAPSHOT_CACHE like GET /dashboard:
+      {"event": "snapshot", "cached": true, "preferences", "dashboard_id", "sections", "votes"?}
+    A cold build streams:
+      {"event": "meta", "preferences", "dashboard_id", "cached", "votes"?}
+      {"event": "section", "name", "section"}   (as each section resolves)
+      {"event": "done", "dashboard_id"}         (after the snapshot is persisted)
+    The daily_dashboard row is inserted up front, so the client has its id (and can vote on
+    sections) before the rest arrive; other loads see it with placeholders until the build ends.
+
+    If the build is shed by BUILD_ADMISSION, the latest persisted snapshot is sent as a "snapshot"
+    event with "stale": true and its "day"; with no snapshot the endpoint answers 503 + Retry-After
+    (or, once streaming, {"event": "error", "status": 503, "detail", "retry_after"}).
+    """
+    today = datetime.utcnow().date()
 
-    include_charts = "charts" in content_types
-    include_fun = "fun" in content_types
+    cached = SNAPSHOT_CACHE.get((user_id, today))
+    if cached is not None:
+        DASHBOARD_LOADS.inc(endpoint="stream", source="cache")
+        if include_votes:
+            async with async_engine.connect() as conn:
+                cached = with_votes(cached, await load_snapshot_votes(conn, user_id, cached[0]))
+        return StreamingResponse(iter([snapshot_line(cached)]), media_type="application/x-ndjson")
+
+    async with async_engine.connect() as conn:
+        ctx = await load_user_context(conn, user_id, today, include_votes=include_votes)
+    prefs = ctx["preferences"] if ctx else None
+    if prefs is None:
+        raise HTTPException(400, "Onboarding not completed")
 
-    # Keep total content tight when adding optional sections
-    news_limit = 5 - (1 if include_charts else 0) - (1 if include_fun else 0)
-    news_limit = max(2, news_limit)
-
-    async with httpx.AsyncClient(timeout=12) as client:
-        prices = await fetch_prices(client, asset_ids)
-        news = await fetch_news(client, prefs, limit=news_limit)
-        insight = await fetch_ai_insight(client, investor_type, asset_ids)
-
-        sections = {
-            "prices": prices,
-            "news": news,
-            "ai_insight": insight,
-            "meme": pick_meme(prefs),
+    existing = ctx["dashboard"]
+    DASHBOARD_LOADS.inc(endpoint="stream", source="snapshot" if existing else "rebuild")
+    log.info("dashboard stream", extra={"user_id": user_id, "day": str(today), "existing": existing is not None})
+
+    # Nothing to build with and no room to build: fail before the 200 goes out
+    fallback = None
+    if existing is None and not DEV_MODE and BUILD_ADMISSION.saturated():
+        fallback = await load_fallback_dashboard(user_id, include_votes)
+        if fallback is None:
+            raise overloaded_error(Overloaded(BUILD_ADMISSION.retry_after))
+
+    def meta(dashboard_id: int, cached: bool, votes: list | None) -> dict:
+        event = {"event": "meta", "preferences": prefs, "dashboard_id": dashboard_id, "cached": cached}
+        if include_votes:
+            event["votes"] = votes or []
+        return event
+
+    async def shed_events(e: Overloaded, latest: dict | None):
+        if latest is None:
+            latest = await load_fallback_dashboard(user_id, include_votes)
+        if latest is None:
+            yield {"event": "error", "status": 503, "detail": "Server busy, please retry", "retry_after": e.retry_after}
+            return
+        DASHBOARD_LOADS.inc(endpoint="stream", source="fallback")
+        log.warning("dashboard build shed", extra={"user_id": user_id, "fallback_day": str(latest["day"])})
+        event = {
+            "event": "snapshot",
+            "cached": True,
+            "stale": True,
+            "day": str(latest["day"]),
+            "preferences": prefs,
+            "dashboard_id": latest["dashboard_id"],
+            "sections": latest["sections"],
         }
+        if include_votes:
+            event["votes"] = latest["votes"]
+        yield event
+
+    async def build_events():
+        async with async_engine.begin() as conn:
+            dashboard_id = await reserve_dashboard_id(conn, user_id, today)
+        # Loads of the (still empty) row while this build runs must not start a completion of their own
+        SECTION_COMPLETIONS.set((user_id, today), time.time())
+        yield meta(dashboard_id, False, [])
+
+        if DEV_MODE:
+            sections = mock_sections(prefs, today)
+            for name, section in sections.items():
+                yield {"event": "section", "name": name, "section": section}
+        else:
+            builders, local = section_builders(prefs, await get_feedback(user_id))
+            sections = dict(local)
+            for name, section in local.items():
+                yield {"event": "section", "name": name, "section": section}
+            async for name, section in iter_sections(builders, DASHBOARD_SECTION_TIMEOUT, DASHBOARD_BUILD_BUDGET):
+                sections[name] = section
+                yield {"event": "section", "name": name, "section": section}
+
+        async with async_engine.begin() as conn:
+            await save_daily_dashboard(conn, user_id, today, completed_sections(sections), dashboard_id=dashboard_id)
+        missing = [name for name, section in sections.items() if section_incomplete(section)]
+        schedule_completion(user_id, today, prefs, dashboard_id, missing)
+        yield {"event": "done", "dashboard_id": dashboard_id}
+
+    async def events():
+        if existing is not None:
+            sections, missing = with_placeholders(prefs, existing["sections"])
+            schedule_completion(user_id, today, prefs, existing["dashboard_id"], missing)
+            entry = cache_dashboard_response(user_id, today, prefs, existing["dashboard_id"], sections, cache=not missing)
+            yield snapshot_line(with_votes(entry, ctx["votes"]) if include_votes else entry)
+            return
+        if fallback is not None:
+            async for event in shed_events(Overloaded(BUILD_ADMISSION.retry_after), fallback):
+                yield event
+            return
+        if DEV_MODE:
+            async for event in build_events():
+                yield event
+            return
+
+        # Admission is decided before the dashboard id is reserved, so a shed build leaves no gap
+        try:
+            async with BUILD_ADMISSION.admit():
+                async for event in build_events():
+                    yield event
+        except Overloaded as e:
+            async for event in shed_events(e, None):
+                yield event
 
-        if include_charts:
-            sections["chart"] = await fetch_price_chart(client, asset_ids, days=7)
-
-        if include_fun:
-            sections["fun"] = generate_fun_section(prefs)
-
-    with engine.begin() as conn:
-        dashboard_id = save_daily_dashboard(conn, user_id, today, sections)
+    async def ndjson():
+        async for event in events():
+            yield event if isinstance(event, bytes) else json.dumps(event) + "\n"
 
-    return {"preferences": prefs, "dashboard_id": dashboard_id, "sections": sections}
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 @app.post("/dashboard/refresh/{section}")
-async def refresh_section(section: str, user_id: int = Depends(get_user_id)):
+async def refresh_section(section: str, include_votes: bool = False, user_id: int = Depends(get_user_id)):
+    """
+    Rate-limited per user (REFRESH_LIMITER, 429 + Retry-After) and admitted like a cold build
+    (503 + Retry-After when shed). Invalid sections are rejected before either.
+    """
     if section not in ALLOWED_DASHBOARD_SECTIONS:
         raise HTTPException(400, "Invalid section")
 
-    with engine.connect() as conn:
-        prefs = load_user_preferences(conn, user_id)
+    retry_after = REFRESH_LIMITER.hit(user_id)
+    if retry_after is not None:
+        raise HTTPException(429, "Too many refreshes, please retry later",
+                            headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+    try:
+        async with BUILD_ADMISSION.admit():
+            # User-triggered, but it yields upstream quota to first page loads
+            with upstream_lane(REFRESH):
+                return await _refresh_section(section, include_votes, user_id)
+    except Overloaded as e:
+        raise overloaded_error(e)
+
+
+async def _refresh_section(section: str, include_votes: bool, user_id: int):
+    today = datetime.utcnow().date()
+
+    async with async_engine.connect() as conn:
+        ctx = await load_user_context(conn, user_id, today, include_votes=include_votes)
+    prefs = ctx["preferences"] if ctx else None
     if prefs is None:
         raise HTTPException(400, "Onboarding not completed")
 
-    today = datetime.utcnow().date()
-    print(f"[REFRESH] user={user_id} section={section} day={today} at={datetime.utcnow().isoformat()}Z")
+    log.info("dashboard refresh", extra={"user_id": user_id, "section": section, "day": str(today)})
 
-    with engine.connect() as conn:
-        existing = load_daily_dashboard(conn, user_id, today)
+    existing = ctx["dashboard"]
     if existing is None:
         raise HTTPException(400, "Daily dashboard not generated yet. Call GET /dashboard first.")
 
+    def respond(payload: dict, votes: list | None) -> dict:
+        if include_votes:
+            payload["votes"] = votes or []
+        return payload
+
     assets = [str(x).strip().lower() for x in (prefs.get("crypto_assets") or []) if str(x).strip()]
     investor_type = prefs.get("investor_type") or ""
 
-    async with httpx.AsyncClient(timeout=12) as client:
-        if section == "prices":
-            new_value = await fetch_prices(client, assets)
+    if section == "prices":
+        new_value = await fetch_prices(assets)
 
-        elif section == "news":
-            content_types = set(prefs.get("content_type") or [])
-            include_charts = "charts" in content_types
-            include_fun = "fun" in content_types
-            news_limit = max(2, 5 - (1 if include_charts else 0) - (1 if include_fun else 0))
-            new_value = await fetch_news(client, prefs, limit=news_limit)
-            titles = [x.get("title") for x in (new_value.get("data") or [])][:3] if isinstance(new_value, dict) else []
-            print(f"[NEWS] fetched {len(new_value.get('data') or []) if isinstance(new_value, dict) else 0} items. top3={titles}")
+    elif section == "news":
+        feedback = await get_feedback(user_id)
+        new_value = await fetch_news(prefs, limit=news_limit_for(prefs, feedback), feedback=feedback)
+        if log.isEnabledFor(logging.DEBUG):
+            items = new_value.get("data") or []
+            log.debug("news refreshed", extra={"items": len(items), "top3": [x.get("title") for x in items[:3]]})
 
+    elif section == "ai_insight":
+        prices = await fetch_prices(assets)
+        new_value = await fetch_ai_insight(investor_type, assets, prices=prices.get("data"), use_cache=False)
 
-        elif section == "ai_insight":
-            new_value = await fetch_ai_insight(client, investor_type, assets)
+    elif section == "meme":
+        current = (existing.get("sections") or {}).get("meme") or {}
+        exclude = set()
+        if isinstance(current, dict):
+            if current.get("id"):
+                exclude.add(str(current["id"]))
+            if current.get("url"):
+                exclude.add(str(current["url"]))
+        new_value = pick_meme(prefs, exclude_ids_or_urls=exclude, feedback=await get_feedback(user_id))
 
-        elif section == "meme":
-            current = (existing.get("sections") or {}).get("meme") or {}
-            exclude = set()
-            if isinstance(current, dict):
-                if current.get("id"):
-                    exclude.add(str(current["id"]))
-                if current.get("url"):
-                    exclude.add(str(current["url"]))
-            new_value = pick_meme(prefs, exclude_ids_or_urls=exclude)
+    elif section == "chart":
+        new_value = await fetch_price_chart(assets, days=7)
 
-        elif section == "chart":
-            new_value = await fetch_price_chart(client, assets, days=7)
+    elif section == "fun":
+        new_value = generate_fun_section(prefs)
 
-        elif section == "fun":
-            new_value = generate_fun_section(prefs)
-
-        else:
-            raise HTTPException(400, "Invalid section")
+    else:
+        raise HTTPException(400, "Invalid section")
 
     # Prevent overwriting good data with empty/failed payloads
     if isinstance(new_value, dict):
         if new_value.get("error") and not (new_value.get("data") or {}):
-            return {
+            return respond({
                 "preferences": prefs,
                 "dashboard_id": existing["dashboard_id"],
                 "sections": existing["sections"],
                 "updated": section,
                 "skipped": True,
-            }
+            }, ctx["votes"])
 
 
         if section in ("prices", "chart") and not (new_value.get("data") or {}):
-            return {
+            return respond({
                 "preferences": prefs,
                 "dashboard_id": existing["dashboard_id"],
                 "sections": existing["sections"],
                 "updated": section,
                 "skipped": True,
-            }
+            }, ctx["votes"])
 
     latest = dict(existing.get("sections") or {})
     latest[section] = new_value
 
-    with engine.begin() as conn:
-        dashboard_id = save_daily_dashboard(conn, user_id, today, latest)
+    # Only the refreshed section is written; identical content writes nothing
+    async with async_engine.begin() as conn:
+        dashboard_id = await save_dashboard_section(conn, user_id, today, existing, section, new_value)
+
+    if dashboard_id is None:
+        return respond({
+            "preferences": prefs,
+            "dashboard_id": existing["dashboard_id"],
+            "sections": existing["sections"],
+            "updated": section,
+            "unchanged": True,
+        }, ctx["votes"])
 
-    return {"preferences": prefs, "dashboard_id": dashboard_id, "sections": latest, "updated": section}
+    # Votes are per snapshot, so the new snapshot starts with none
+    return respond({"preferences": prefs, "dashboard_id": dashboard_id, "sections": latest, "updated": section}, [])
 
 
 # =========================================================
 # Votes
 # =========================================================
-@app.post("/votes")
-def vote(data: VoteReq, user_id: int = Depends(get_user_id)):
+def validate_vote(data: VoteReq):
     if data.value not in (1, -1):
         raise HTTPException(400, "value must be 1 or -1")
 
@@ -1022,49 +2757,161 @@ def vote(data: VoteReq, user_id: int = Depends(get_user_id)):
     if data.section not in ALLOWED_DASHBOARD_SECTIONS:
         raise HTTPException(400, "Invalid section")
 
-    q = text("""
-        INSERT INTO user_votes (user_id, day, dashboard_id, section, item, value)
-        VALUES (:user_id, CURRENT_DATE, :dashboard_id, :section, :item, :value)
-        ON CONFLICT (user_id, dashboard_id, section, item)
-        DO UPDATE SET value = EXCLUDED.value, created_at = now()
-    """)
 
-    with engine.begin() as conn:
-        conn.execute(q, {
-            "user_id": user_id,
-            "dashboard_id": data.dashboard_id,
-            "section": data.section,
-            "item": data.item,
-            "value": data.value,
-        })
+def vote_features(section: str, item: str) -> list[tuple[str, str]]:
+    """
+    What a vote counts towards in user_affinity: its section, plus the meme's tags
+    or the news item's keywords.
+    """
+    features = [("section", section)]
+    if section == "meme":
+        features += [("meme_tag", tag) for tag in MEME_INDEX.tags_for(item)]
+    elif section == "news":
+        features += [("news_keyword", kw) for kw in sorted(news_item_keywords(item))]
+    return features
+
+
+def vote_row(user_id: int, day_: date, v: VoteReq) -> dict:
+    return {
+        "user_id": user_id, "day": day_, "dashboard_id": v.dashboard_id,
+        "section": v.section, "item": v.item, "value": v.value,
+        "features": vote_features(v.section, v.item),
+    }
+
+
+async def write_votes(user_id: int, rows: list[dict]):
+    """
+    Synchronous vote write (no write-behind, or the buffer is full); 503 if the DB write fails.
+    Same upsert as the buffered path, so the vote aggregates stay in step. The upsert drops votes
+    on dashboards that don't exist or aren't the user's: the batch is then rolled back with a 404.
+    """
+    try:
+        async with async_engine.begin() as conn:
+            written = await upsert_votes(conn, rows)
+            if written < len(collapse_votes(rows)):
+                raise HTTPException(404, "Dashboard not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("vote write failed", extra={"user_id": user_id, "votes": len(rows), "error": str(e)})
+        raise HTTPException(503, "Votes can't be saved right now, please retry", headers={"Retry-After": "5"})
+    forget_feedback([user_id])
+
+
+@app.post("/votes")
+async def vote(data: VoteReq, user_id: int = Depends(get_user_id)):
+    validate_vote(data)
+    row = vote_row(user_id, datetime.utcnow().date(), data)
+
+    if not (VOTE_WRITE_BEHIND and VOTE_BUFFER.add(row)):
+        await write_votes(user_id, [row])
 
     return {"message": "vote saved"}
 
 
+@app.post("/votes/batch")
+async def vote_batch(data: VoteBatchReq, user_id: int = Depends(get_user_id)):
+    """
+    Several votes in one request (e.g. a burst of thumbs clicks); later votes on the same item win.
+    Without write-behind the batch is still one statement and one commit.
+    """
+    if len(data.votes) > VOTE_BATCH_MAX:
+        raise HTTPException(400, f"At most {VOTE_BATCH_MAX} votes per batch")
+    for v in data.votes:
+        validate_vote(v)
+
+    today = datetime.utcnow().date()
+    rows = [vote_row(user_id, today, v) for v in data.votes]
+    if VOTE_WRITE_BEHIND:
+        # Whatever doesn't fit in the buffer is written now
+        rows = [row for row in rows if not VOTE_BUFFER.add(row)]
+
+    if rows:
+        await write_votes(user_id, rows)
+    return {"message": "votes saved", "count": len(data.votes)}
+
+
 @app.get("/votes")
-def get_votes(
+async def get_votes(
     date: str = Query("today"),
     dashboard_id: int | None = None,
     user_id: int = Depends(get_user_id),
 ):
     q = """
-        SELECT section, item, value
+        SELECT section, item, value, dashboard_id
         FROM user_votes
         WHERE user_id = :user_id
     """
     params = {"user_id": user_id}
 
+    # "today" is the UTC day votes are written with, not the database's CURRENT_DATE
+    q += " AND day = :day"
     if date == "today":
-        q += " AND day = CURRENT_DATE"
+        day_ = datetime.utcnow().date()
     else:
-        q += " AND day = :day"
-        params["day"] = date  # expects YYYY-MM-DD
+        try:
+            day_ = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(400, "date must be 'today' or YYYY-MM-DD")
+    params["day"] = day_
 
     if dashboard_id is not None:
         q += " AND dashboard_id = :dashboard_id"
         params["dashboard_id"] = dashboard_id
 
-    with engine.connect() as conn:
-        rows = conn.execute(text(q), params).fetchall()
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(text(q), params)).fetchall()
+
+    # Buffered (not yet flushed) votes override what's in the table
+    votes = [{"dashboard_id": r[3], "section": r[0], "item": r[1], "value": r[2]} for r in rows]
+    votes = VOTE_BUFFER.merge(votes, user_id, day_=day_)
+    if dashboard_id is not None:
+        votes = [v for v in votes if v["dashboard_id"] == dashboard_id]
+    return [{"section": v["section"], "item": v["item"], "value": v["value"]} for v in votes]
+
+
+# =========================================================
+# Ops
+# =========================================================
+async def require_ops_token(creds: HTTPAuthorizationCredentials | None = Depends(HTTPBearer(auto_error=False))):
+    if not OPS_TOKEN:
+        raise HTTPException(403, "OPS_TOKEN is not set")
+    if creds is None or not hmac.compare_digest(creds.credentials.encode("utf-8"), OPS_TOKEN.encode("utf-8")):
+        raise HTTPException(401, "Invalid ops token")
+
+
+# async: the stats walk dicts the event loop mutates, so they must not run on a worker thread
+@app.get("/stats", dependencies=[Depends(require_ops_token)])
+async def stats():
+    """
+    Internal counters used to confirm pooling/caching is effective.
+    """
+    return {
+        "http_pool": pool_stats(),
+        "price_cache": PRICE_CACHE.stats(),
+        "chart_cache": CHART_CACHE.stats(),
+        "news_cache": NEWS_CACHE.stats(),
+        "insight_cache": INSIGHT_CACHE.stats(),
+        "snapshot_cache": SNAPSHOT_CACHE.stats(),
+        "password_hasher": hasher_stats(),
+        "token_cache": TOKEN_CACHE.stats(),
+        "meme_catalog": {**MEME_INDEX.stats(), **MEMES_STATUS},
+        "votes": {**VOTE_BUFFER.stats(), "write_behind": VOTE_WRITE_BEHIND},
+        "feedback_cache": FEEDBACK_CACHE.stats(),
+        "single_flight": UPSTREAM_FLIGHTS.stats(),
+        "upstream_scheduler": scheduler_stats(),
+        "circuit_breakers": breaker_stats(),
+        "prewarm": {**PREWARM_STATUS, "enabled": PREWARM_ENABLED},
+        "cohorts": cohort_stats(),
+        "admission": admission_stats(),
+    }
+
+
+@app.get("/metrics", dependencies=[Depends(require_ops_token)])
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 
-    return [{"section": r[0], "item": r[1], "value": r[2]} for r in rows]
+@app.get("/stats/market-store", dependencies=[Depends(require_ops_token)])
+async def stats_market_store():
+    return market_store_report()
@@ -0,0 +1,203 @@
+import json
+import random
+import bisect
+from functools import lru_cache
+from pathlib import Path
+
+# Scoring (per meme, per preference profile):
+#   +4 investor_type tag match, +2 per content tag match, +1 per asset match (max 3)
+# sampling weight = score + 1, so every meme keeps a chance.
+INVESTOR_SCORE = 4
+CONTENT_SCORE = 2
+ASSET_SCORE_CAP = 3
+
+
+def _tag_set(values) -> frozenset:
+    if not isinstance(values, list):
+        values = [values] if values else []
+    return frozenset(str(x).strip().lower() for x in values if str(x).strip())
+
+
+def profile_key(prefs: dict) -> tuple:
+    """
+    (investor_type, content tags, asset tags), normalized the same way as meme tags.
+    """
+    return (
+        (prefs.get("investor_type") or "").strip().lower(),
+        _tag_set(prefs.get("content_type") or []),
+        _tag_set(prefs.get("crypto_assets") or []),
+    )
+
+
+class MemeIndex:
+    """
+    Immutable, pre-indexed view of the meme catalog.
+
+    Sampling for a profile is split in two: every meme has base weight 1 (uniform pick),
+    and only memes matching the profile carry extra weight. The per-profile table holds
+    cumulative extra weights of the matching memes only, so building it costs O(matches)
+    and a draw is one bisect.
+
+    Vote popularity is shared by all users and goes into the profile table. A user's own tag
+    affinity does not: it is applied at sample time as a sparse adjustment over the memes
+    carrying the user's voted tags, so users with the same profile share one table.
+    """
+
+    def __init__(self, memes: list[dict], profile_cache_size: int = 1024):
+        self.memes = [m for m in memes if str(m.get("url") or "")]
+        self.raw = memes
+        self.by_investor: dict[str, list[int]] = {}
+        self.by_content: dict[str, list[int]] = {}
+        self.by_asset: dict[str, list[int]] = {}
+        self.keys: list[tuple[str, str]] = []  # (id, url) per meme, for exclusion checks
+        self.by_ref: dict[str, int] = {}  # id or url -> meme index (votes reference memes by url)
+        self.features: list[tuple[str, ...]] = []  # "investor:long_term", "content:fun", "asset:bitcoin"
+        self.by_feature: dict[str, list[int]] = {}
+
+        for i, m in enumerate(self.memes):
+            tags = m.get("tags") or {}
+            features = []
+            for index, field, prefix in (
+                (self.by_investor, "investor", "investor"),
+                (self.by_content, "content", "content"),
+                (self.by_asset, "assets", "asset"),
+            ):
+                for tag in _tag_set(tags.get(field) or []):
+                    index.setdefault(tag, []).append(i)
+                    features.append(f"{prefix}:{tag}")
+            for f in features:
+                self.by_feature.setdefault(f, []).append(i)
+            self.features.append(tuple(features))
+            mid, url = str(m.get("id") or ""), str(m.get("url") or "")
+            self.keys.append((mid, url))
+            for ref in (mid, url):
+                if ref:
+                    self.by_ref.setdefault(ref, i)
+
+        self.profile_table = lru_cache(maxsize=profile_cache_size)(self._build_profile_table)
+
+    def __len__(self):
+        return len(self.memes)
+
+    def tags_for(self, ref: str) -> tuple[str, ...]:
+        """
+        Tag features of the meme with this id or url (empty if unknown).
+        """
+        i = self.by_ref.get(ref)
+        return self.features[i] if i is not None else ()
+
+    def _build_profile_table(self, key: tuple, popularity=None) -> tuple[list[int], list[int], dict[int, int]]:
+        """
+        -> (meme indexes with a positive extra weight, cumulative extra weights,
+            {meme index: score} for every non-zero score, before clamping at 0)
+        popularity (feedback.ItemScores) adds the memes' vote popularity to the preference score.
+        """
+        investor_type, content, assets = key
+        scores: dict[int, int] = {}
+        for i in self.by_investor.get(investor_type, ()) if investor_type else ():
+            scores[i] = scores.get(i, 0) + INVESTOR_SCORE
+        for tag in content:
+            for i in self.by_content.get(tag, ()):
+                scores[i] = scores.get(i, 0) + CONTENT_SCORE
+        asset_hits: dict[int, int] = {}
+        for tag in assets:
+            for i in self.by_asset.get(tag, ()):
+                asset_hits[i] = asset_hits.get(i, 0) + 1
+        for i, hits in asset_hits.items():
+            scores[i] = scores.get(i, 0) + min(ASSET_SCORE_CAP, hits)
+
+        if popularity is not None:
+            for ref in popularity.get("meme", {}):
+                i = self.by_ref.get(ref)
+                if i is not None:
+                    mid, url = self.keys[i]
+                    scores[i] = scores.get(i, 0) + (popularity.bonus("meme", url) or popularity.bonus("meme", mid))
+
+        ids, cumulative = self._cumulative({i: score for i, score in scores.items() if score > 0})
+        return ids, cumulative, {i: score for i, score in scores.items() if score}
+
+    @staticmethod
+    def _cumulative(weights: dict[int, int]) -> tuple[list[int], list[int]]:
+        ids = sorted(weights)
+        cumulative = []
+        total = 0
+        for i in ids:
+            total += weights[i]
+            cumulative.append(total)
+        return ids, cumulative
+
+    def _affinity(self, feedback) -> dict[int, int]:
+        """
+        {meme index: the user's tag affinity bonus}, for the memes carrying a tag they voted on.
+        """
+        touched = set()
+        for feature in feedback.affinity.get("meme_tag", {}):
+            touched.update(self.by_feature.get(feature, ()))
+        bonuses = {i: feedback.affinity_bonus("meme_tag", self.features[i]) for i in touched}
+        return {i: b for i, b in bonuses.items() if b}
+
+    def _draw(self, table: tuple, extra_ids: list[int], extra_cum: list[int]) -> int:
+        ids, cumulative, _ = table
+        n, profile = len(self.memes), (cumulative[-1] if cumulative else 0)
+        r = random.randrange(n + profile + (extra_cum[-1] if extra_cum else 0))
+        if r < n:
+            return r
+        if r < n + profile:
+            return ids[bisect.bisect_right(cumulative, r - n)]
+        return extra_ids[bisect.bisect_right(extra_cum, r - n - profile)]
+
+    def sample(self, prefs: dict, exclude: set[str] | None = None, feedback=None, attempts: int = 8) -> dict | None:
+        """
+        Weighted pick for prefs (and the user's vote feedback, if given); None if every meme
+        is excluded (or the catalog is empty).
+        Excluded memes are rejected and redrawn (exclude sets are tiny: the current meme).
+        """
+        if not self.memes:
+            return None
+        table = self.profile_table(profile_key(prefs), feedback.items if feedback is not None else None)
+        raw = table[2]
+        affinity = self._affinity(feedback) if feedback is not None else {}
+
+        # Affinity changes a meme's extra weight from max(0, raw) to max(0, raw + bonus). Increases
+        # are drawn from a small per-call table; decreases by rejecting the meme in proportion.
+        raised, lowered = {}, {}
+        for i, bonus in affinity.items():
+            before, after = max(0, raw.get(i, 0)), max(0, raw.get(i, 0) + bonus)
+            if after > before:
+                raised[i] = after - before
+            elif after < before:
+                lowered[i] = (1 + after) / (1 + before)
+        extra_ids, extra_cum = self._cumulative(raised)
+
+        for _ in range(attempts):
+            i = self._draw(table, extra_ids, extra_cum)
+            if i in lowered and random.random() >= lowered[i]:
+                continue
+            mid, url = self.keys[i]
+            if not exclude or (mid not in exclude and url not in exclude):
+                return self.memes[i]
+
+        # Unlucky or nearly everything excluded: draw once over the remaining memes
+        exclude = exclude or set()
+        allowed = [i for i, (mid, url) in enumerate(self.keys) if mid not in exclude and url not in exclude]
+        if not allowed:
+            return None
+        weights = [1 + max(0, raw.get(i, 0) + affinity.get(i, 0)) for i in allowed]
+        return self.memes[random.choices(allowed, weights=weights, k=1)[0]]
+
+    def stats(self) -> dict:
+        info = self.profile_table.cache_info()
+        total = info.hits + info.misses
+        return {
+            "memes": len(self.memes),
+            "investor_tags": len(self.by_investor),
+            "content_tags": len(self.by_content),
+            "asset_tags": len(self.by_asset),
+            "profiles_cached": info.currsize,
+            "profile_hit_ratio": round(info.hits / total, 3) if total else None,
+        }
+
+
+def read_catalog(path: str) -> list[dict]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return data.get("memes", []) or []
@@ -0,0 +1,89 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# bcrypt runs on its own small thread pool (bcrypt releases the GIL while hashing),
+# so a login burst can't starve the threads the sync endpoints run on.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))  # max jobs waiting for a worker
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))  # seconds
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_SLOTS = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+HASHER_STATS = {"waiting": 0, "completed": 0, "rejected": 0}
+
+
+class PasswordHasherBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("password hasher saturated")
+        self.retry_after = retry_after
+
+
+async def _run(fn, *args):
+    """
+    Runs fn on the bcrypt pool. Waits in a bounded queue for a free worker;
+    raises PasswordHasherBusy if the queue is full or the wait times out.
+    """
+    if HASHER_STATS["waiting"] >= PASSWORD_HASH_QUEUE:
+        HASHER_STATS["rejected"] += 1
+        raise PasswordHasherBusy(retry_after=max(1, int(PASSWORD_HASH_QUEUE_TIMEOUT)))
+
+    HASHER_STATS["waiting"] += 1
+    try:
+        await asyncio.wait_for(_SLOTS.acquire(), PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        HASHER_STATS["rejected"] += 1
+        raise PasswordHasherBusy(retry_after=max(1, int(PASSWORD_HASH_QUEUE_TIMEOUT)))
+    finally:
+        HASHER_STATS["waiting"] -= 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_EXECUTOR, fn, *args)
+    finally:
+        _SLOTS.release()
+        HASHER_STATS["completed"] += 1
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await _run(_check, password, password_hash)
+
+
+def hash_cost(password_hash: str) -> int | None:
+    """
+    "$2b$12$..." -> 12
+    """
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return hash_cost(password_hash) != BCRYPT_ROUNDS
+
+
+def hasher_stats() -> dict:
+    return {
+        **HASHER_STATS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_max": PASSWORD_HASH_QUEUE,
+        "rounds": BCRYPT_ROUNDS,
+    }
@@ -36,6 +36,33 @@ CREATE TABLE IF NOT EXISTS daily_dashboard (
 CREATE INDEX IF NOT EXISTS idx_daily_dashboard_user_day_created
   ON daily_dashboard (user_id, day, created_at DESC);
 
+-- dashboard_sections
+-- Per-section versions: a snapshot references one version per section, so a refresh only
+-- writes the section that changed. Versions are content-addressed per (user, day, name).
+CREATE TABLE IF NOT EXISTS dashboard_sections (
+  id           BIGSERIAL PRIMARY KEY,
+  user_id      BIGINT NOT NULL,
+  day          DATE NOT NULL DEFAULT CURRENT_DATE,
+  name         TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  content      JSONB NOT NULL,
+  created_at   TIMESTAMP NOT NULL DEFAULT now(),
+  CONSTRAINT fk_sections_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+  CONSTRAINT unique_section_version UNIQUE (user_id, day, name, content_hash)
+);
+
+-- dashboard_snapshot_sections
+-- snapshot -> section version mapping. Snapshots written before this table existed keep their
+-- content in daily_dashboard.sections and have no mapping rows.
+CREATE TABLE IF NOT EXISTS dashboard_snapshot_sections (
+  dashboard_id BIGINT NOT NULL,
+  name         TEXT NOT NULL,
+  section_id   BIGINT NOT NULL,
+  CONSTRAINT pk_dashboard_snapshot_sections PRIMARY KEY (dashboard_id, name),
+  CONSTRAINT fk_snapshot_dashboard FOREIGN KEY (dashboard_id) REFERENCES daily_dashboard(id) ON DELETE CASCADE,
+  CONSTRAINT fk_snapshot_section FOREIGN KEY (section_id) REFERENCES dashboard_sections(id) ON DELETE CASCADE
+);
+
 -- user_votes
 -- IMPORTANT CHANGE:
 -- 1) added dashboard_id to link vote -> exact dashboard snapshot
@@ -60,3 +87,45 @@ CREATE INDEX IF NOT EXISTS idx_user_votes_user_day
 
 CREATE INDEX IF NOT EXISTS idx_user_votes_dashboard
   ON user_votes (dashboard_id);
+
+-- Vote aggregates, maintained incrementally by the vote upsert (votes.py)
+-- vote_item_scores: net score per voted item across all users
+CREATE TABLE IF NOT EXISTS vote_item_scores (
+  section      TEXT NOT NULL,
+  item         TEXT NOT NULL,
+  score        INTEGER NOT NULL DEFAULT 0,
+  up           INTEGER NOT NULL DEFAULT 0,
+  down         INTEGER NOT NULL DEFAULT 0,
+  updated_at   TIMESTAMP NOT NULL DEFAULT now(),
+  CONSTRAINT pk_vote_item_scores PRIMARY KEY (section, item)
+);
+
+CREATE INDEX IF NOT EXISTS idx_vote_item_scores_section_updated
+  ON vote_item_scores (section, updated_at);
+
+-- user_affinity: per-user running sum of vote values per feature
+-- kind = 'section' | 'meme_tag' ("investor:long_term", "content:fun", "asset:bitcoin") | 'news_keyword'
+CREATE TABLE IF NOT EXISTS user_affinity (
+  user_id      BIGINT NOT NULL,
+  kind         TEXT NOT NULL,
+  key          TEXT NOT NULL,
+  score        INTEGER NOT NULL DEFAULT 0,
+  updated_at   TIMESTAMP NOT NULL DEFAULT now(),
+  CONSTRAINT pk_user_affinity PRIMARY KEY (user_id, kind, key),
+  CONSTRAINT fk_affinity_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- One-time backfill from votes cast before the aggregates existed
+-- (tag/keyword affinity can't be derived in SQL; it builds up from new votes)
+INSERT INTO vote_item_scores (section, item, score, up, down)
+SELECT section, item, SUM(value),
+       COUNT(*) FILTER (WHERE value = 1), COUNT(*) FILTER (WHERE value = -1)
+FROM user_votes
+WHERE NOT EXISTS (SELECT 1 FROM vote_item_scores)
+GROUP BY section, item;
+
+INSERT INTO user_affinity (user_id, kind, key, score)
+SELECT user_id, 'section', section, SUM(value)
+FROM user_votes
+WHERE NOT EXISTS (SELECT 1 FROM user_affinity)
+GROUP BY user_id, section;
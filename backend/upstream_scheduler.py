@@ -0,0 +1,262 @@
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from circuit import get_breaker
+from http_client import UPSTREAMS, UPSTREAM_MAX_RETRIES, UPSTREAM_BACKOFF_BASE, UPSTREAM_BACKOFF_MAX, LANE_MAX_WAIT
+from logs import get_logger
+from metrics import Counter, Histogram, Gauge
+
+log = get_logger("upstream")
+
+# Priority lanes, lowest value first: interactive page loads go ahead of user-triggered
+# section refreshes, which go ahead of background work (market ingest, prewarming).
+INTERACTIVE, REFRESH, BACKGROUND = 0, 1, 2
+LANES = {INTERACTIVE: "interactive", REFRESH: "refresh", BACKGROUND: "background"}
+
+_LANE: contextvars.ContextVar[int] = contextvars.ContextVar("upstream_lane", default=INTERACTIVE)
+
+SCHEDULER_WAIT = Histogram(
+    "upstream_scheduler_wait_seconds", "Time spent waiting for an upstream rate-limit slot", ("upstream", "lane"),
+)
+SCHEDULER_RETRIES = Counter(
+    "upstream_scheduler_retries_total", "Upstream calls retried after a 429", ("upstream",),
+)
+SCHEDULER_REJECTED = Counter(
+    "upstream_scheduler_rejected_total", "Upstream calls given up without a slot (wait over the lane limit)",
+    ("upstream", "lane"),
+)
+
+
+class UpstreamBusy(Exception):
+    """
+    No rate-limit slot within the lane's max wait; callers treat it like an upstream failure.
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} rate-limited, retry in {retry_after:.1f}s")
+
+
+@contextmanager
+def upstream_lane(lane: int):
+    """
+    Upstream calls made inside the block (including single-flight tasks started there)
+    are scheduled in this lane.
+    """
+    token = _LANE.set(lane)
+    try:
+        yield
+    finally:
+        _LANE.reset(token)
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """
+    Retry-After as delta-seconds or an HTTP date; None if missing or unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class UpstreamScheduler:
+    """
+    Token bucket for one upstream plus a priority queue of waiting callers.
+
+    The bucket refills at the plan's rate up to `burst`. A 429 empties it and blocks the
+    upstream until Retry-After (or an exponential backoff when the header is missing), with
+    jitter so queued callers don't all fire at the same instant. Waiters are released one
+    token at a time, lowest lane first, by a single dispatcher task.
+    """
+
+    def __init__(self, name: str, rate_per_min: float, burst: int, max_retries: int = UPSTREAM_MAX_RETRIES):
+        self.name = name
+        self.rate = rate_per_min / 60  # tokens per second; 0 disables limiting
+        self.burst = max(1, burst)
+        self.max_retries = max_retries
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.backoff_level = 0
+        self._waiters: list[list] = []  # heap of [lane, seq, future]
+        self._seq = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+        self.counts = {"calls": 0, "queued": 0, "rate_limited": 0, "retries": 0, "rejected": 0}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _slot_in(self, now: float) -> float:
+        """
+        Seconds until the next token can be handed out.
+        """
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    async def _dispatch(self):
+        try:
+            while self._waiters:
+                wait = self._slot_in(time.monotonic())
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                _, _, fut = heapq.heappop(self._waiters)
+                if fut.done():  # caller timed out or was cancelled
+                    continue
+                self.tokens -= 1
+                fut.set_result(None)
+        finally:
+            self._dispatcher = None
+
+    async def acquire(self, lane: int):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        if not self._waiters and self._slot_in(now) == 0:
+            self.tokens -= 1
+            SCHEDULER_WAIT.observe(0.0, upstream=self.name, lane=LANES[lane])
+            return
+
+        max_wait = LANE_MAX_WAIT[lane]
+        blocked_for = self.blocked_until - now
+        if blocked_for > max_wait:
+            self._reject(lane, blocked_for)
+
+        self.counts["queued"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [lane, next(self._seq), fut])
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(fut, max_wait)
+        except asyncio.TimeoutError:
+            self._reject(lane, max(0.0, self.blocked_until - time.monotonic()))
+        SCHEDULER_WAIT.observe(time.monotonic() - now, upstream=self.name, lane=LANES[lane])
+
+    def _reject(self, lane: int, retry_after: float):
+        self.counts["rejected"] += 1
+        SCHEDULER_REJECTED.inc(upstream=self.name, lane=LANES[lane])
+        raise UpstreamBusy(self.name, retry_after)
+
+    def penalize(self, response) -> float:
+        """
+        Applies a 429: empties the bucket and blocks until Retry-After (+ up to 20% jitter),
+        or an exponential backoff with full jitter when the header is missing. Returns the delay.
+        """
+        retry_after = retry_after_seconds(response.headers.get("retry-after"))
+        if retry_after is not None:
+            delay = retry_after * random.uniform(1.0, 1.2)
+        else:
+            delay = random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** self.backoff_level))
+        self.backoff_level = min(self.backoff_level + 1, 16)
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + delay)
+        self.counts["rate_limited"] += 1
+        log.warning("upstream rate-limited", extra={"upstream": self.name, "backoff_s": round(delay, 2)})
+        return delay
+
+    async def call(self, fn):
+        """
+        fn is a zero-arg callable returning an awaitable httpx.Response. 429s are retried
+        (up to max_retries) while the backoff fits the lane's max wait; after that the 429
+        response is returned to the caller. Raises UpstreamBusy if no slot frees up in time.
+        """
+        lane = _LANE.get()
+        self.counts["calls"] += 1
+        attempt = 0
+        while True:
+            await self.acquire(lane)
+            response = await fn()
+            if response.status_code != 429:
+                self.backoff_level = 0
+                return response
+            delay = self.penalize(response)
+            if attempt >= self.max_retries or delay > LANE_MAX_WAIT[lane]:
+                return response
+            attempt += 1
+            self.counts["retries"] += 1
+            SCHEDULER_RETRIES.inc(upstream=self.name)
+
+    def queue_depth(self) -> dict[int, int]:
+        depth = dict.fromkeys(LANES, 0)
+        for lane, _, fut in self._waiters:
+            if not fut.done():
+                depth[lane] += 1
+        return depth
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            **self.counts,
+            "rate_per_min": round(self.rate * 60, 1),
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "blocked_for_s": round(max(0.0, self.blocked_until - now), 2),
+            "waiting": {LANES[lane]: n for lane, n in self.queue_depth().items()},
+        }
+
+
+SCHEDULERS = {name: UpstreamScheduler(name, cfg["rate_per_min"], cfg["burst"]) for name, cfg in UPSTREAMS.items()}
+
+Gauge(
+    "upstream_scheduler_waiting", "Callers queued for an upstream rate-limit slot",
+    lambda: {(name, LANES[lane]): n for name, s in SCHEDULERS.items() for lane, n in s.queue_depth().items()},
+    ("upstream", "lane"),
+)
+
+
+async def scheduled(name: str, fn):
+    """
+    Runs fn (-> awaitable httpx.Response) through the named upstream's circuit breaker and
+    scheduler. Raises CircuitOpen without waiting for a slot while the upstream is down.
+    """
+    breaker = get_breaker(name)
+    breaker.before_call()
+    try:
+        response = await SCHEDULERS[name].call(fn)
+    except UpstreamBusy:
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    if response.status_code >= 500:
+        breaker.record_failure()
+    elif response.status_code == 429:
+        breaker.release()
+    else:
+        breaker.record_success()
+    return response
+
+
+def scheduler_stats() -> dict:
+    return {name: s.stats() for name, s in SCHEDULERS.items()}
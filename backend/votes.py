@@ -0,0 +1,255 @@
+import asyncio
+from datetime import date
+
+from sqlalchemy import text
+
+from logs import get_logger
+
+log = get_logger("votes")
+
+# One statement for any number of votes. Rows whose dashboard doesn't exist or isn't the
+# voter's are dropped by the join instead of failing the whole batch on the FK.
+# The same statement keeps the aggregates in step: each vote's delta (new value minus the
+# value it replaced; every CTE sees the pre-statement snapshot) is added to vote_item_scores
+# and to user_affinity for each of the vote's features. For that snapshot to hold the value
+# actually replaced, concurrent writers of the same key must be serialized: see LOCK_VOTE_KEYS.
+UPSERT_VOTES = text("""
+    WITH v AS (
+        SELECT v.*
+        FROM unnest(
+            CAST(:idx AS int[]),
+            CAST(:user_ids AS bigint[]),
+            CAST(:days AS date[]),
+            CAST(:dashboard_ids AS bigint[]),
+            CAST(:sections AS text[]),
+            CAST(:items AS text[]),
+            CAST(:vals AS smallint[])
+        ) AS v(idx, user_id, day, dashboard_id, section, item, value)
+        JOIN daily_dashboard d ON d.id = v.dashboard_id AND d.user_id = v.user_id
+    ),
+    old AS (
+        SELECT uv.user_id, uv.dashboard_id, uv.section, uv.item, uv.value
+        FROM user_votes uv
+        JOIN v USING (user_id, dashboard_id, section, item)
+    ),
+    written AS (
+        INSERT INTO user_votes (user_id, day, dashboard_id, section, item, value)
+        SELECT user_id, day, dashboard_id, section, item, value FROM v
+        ON CONFLICT (user_id, dashboard_id, section, item)
+        DO UPDATE SET value = EXCLUDED.value, created_at = now()
+        RETURNING user_id, dashboard_id, section, item, value
+    ),
+    delta AS (
+        SELECT v.idx, written.user_id, written.section, written.item,
+               written.value - COALESCE(old.value, 0) AS score,
+               (written.value = 1)::int - COALESCE((old.value = 1)::int, 0) AS up,
+               (written.value = -1)::int - COALESCE((old.value = -1)::int, 0) AS down
+        FROM written
+        JOIN v USING (user_id, dashboard_id, section, item)
+        LEFT JOIN old USING (user_id, dashboard_id, section, item)
+    ),
+    items AS (
+        INSERT INTO vote_item_scores (section, item, score, up, down)
+        SELECT section, item, SUM(score), SUM(up), SUM(down)
+        FROM delta WHERE score <> 0
+        GROUP BY section, item
+        ON CONFLICT (section, item) DO UPDATE SET
+            score = vote_item_scores.score + EXCLUDED.score,
+            up = vote_item_scores.up + EXCLUDED.up,
+            down = vote_item_scores.down + EXCLUDED.down,
+            updated_at = now()
+    ),
+    affinity AS (
+        INSERT INTO user_affinity (user_id, kind, key, score)
+        SELECT delta.user_id, f.kind, f.key, SUM(delta.score)
+        FROM delta
+        JOIN unnest(
+            CAST(:f_idx AS int[]), CAST(:f_kinds AS text[]), CAST(:f_keys AS text[])
+        ) AS f(idx, kind, key) ON f.idx = delta.idx
+        WHERE delta.score <> 0
+        GROUP BY delta.user_id, f.kind, f.key
+        ON CONFLICT (user_id, kind, key) DO UPDATE SET
+            score = user_affinity.score + EXCLUDED.score,
+            updated_at = now()
+    )
+    SELECT count(*) FROM written
+""")
+
+
+# Transaction-scoped advisory locks over the batch's users, taken in a statement of their own
+# before UPSERT_VOTES. A writer that held one has committed by the time we get it, and (READ
+# COMMITTED) the upsert's snapshot is taken after that, so its `old` rows are current: two
+# transactions can no longer both apply a delta against the same pre-image (or the same
+# missing row). Users hash into VOTE_LOCK_BUCKETS locks, taken in order, so a batch holds a
+# bounded number of lock-table slots and can't deadlock on each other's advisory locks.
+VOTE_LOCK_NAMESPACE = 0x766F7465  # classid of the two-key advisory lock space
+VOTE_LOCK_BUCKETS = 64
+LOCK_VOTE_KEYS = text("""
+    SELECT pg_advisory_xact_lock(:namespace, bucket)
+    FROM (
+        SELECT DISTINCT (user_id % :buckets)::int AS bucket
+        FROM unnest(CAST(:user_ids AS bigint[])) AS u(user_id)
+        ORDER BY bucket
+    ) b
+""")
+
+
+def collapse_votes(rows: list[dict]) -> list[dict]:
+    """
+    Latest vote wins per (user_id, dashboard_id, section, item);
+    a multi-row upsert can't touch the same row twice.
+    """
+    latest = {}
+    for r in rows:
+        latest[(r["user_id"], r["dashboard_id"], r["section"], r["item"])] = r
+    return list(latest.values())
+
+
+async def upsert_votes(conn, rows: list[dict]) -> int:
+    """
+    rows: [{user_id, day, dashboard_id, section, item, value, features?}] -> rows written.
+    features: [(kind, key)] the vote counts towards in user_affinity.
+    Must run inside a transaction (the key locks are held until it commits).
+    """
+    rows = collapse_votes(rows)
+    if not rows:
+        return 0
+    f_idx, f_kinds, f_keys = [], [], []
+    for i, r in enumerate(rows):
+        for kind, key in r.get("features") or ():
+            f_idx.append(i)
+            f_kinds.append(kind)
+            f_keys.append(key)
+    await conn.execute(LOCK_VOTE_KEYS, {
+        "namespace": VOTE_LOCK_NAMESPACE,
+        "buckets": VOTE_LOCK_BUCKETS,
+        "user_ids": sorted({r["user_id"] for r in rows}),
+    })
+    result = await conn.execute(UPSERT_VOTES, {
+        "idx": list(range(len(rows))),
+        "user_ids": [r["user_id"] for r in rows],
+        "days": [r["day"] for r in rows],
+        "dashboard_ids": [r["dashboard_id"] for r in rows],
+        "sections": [r["section"] for r in rows],
+        "items": [r["item"] for r in rows],
+        "vals": [r["value"] for r in rows],
+        "f_idx": f_idx,
+        "f_kinds": f_kinds,
+        "f_keys": f_keys,
+    })
+    return int(result.scalar() or 0)
+
+
+class VoteBuffer:
+    """
+    Write-behind buffer for votes. Repeated votes on the same key collapse to the latest;
+    flush() writes everything in one multi-row upsert and one commit.
+    At most max_buffered distinct keys are held (a failed flush puts its batch back on top,
+    so the bound is 2x while the DB is failing); add() refuses new keys beyond that and the
+    caller writes them synchronously instead.
+    Runs on the event loop only (no locking).
+    """
+
+    def __init__(self, engine, flush_interval: float, max_rows: int, max_buffered: int, on_flush=None):
+        self.engine = engine
+        self.on_flush = on_flush  # called with the set of user_ids whose votes were written
+        self.flush_interval = flush_interval
+        self.max_rows = max(1, int(max_rows))
+        self.max_buffered = max(self.max_rows, int(max_buffered))
+        self._pending: dict[tuple, dict] = {}  # (user_id, dashboard_id, section, item) -> row
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.counters = {"received": 0, "collapsed": 0, "flushes": 0, "rows_written": 0, "dropped": 0, "errors": 0,
+                         "overflow": 0}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, row: dict) -> bool:
+        """
+        row: {user_id, day, dashboard_id, section, item, value, features?} (see upsert_votes)
+        False (not buffered) when the buffer is full and the row's key isn't in it already.
+        """
+        key = (row["user_id"], row["dashboard_id"], row["section"], row["item"])
+        if key not in self._pending and len(self._pending) >= self.max_buffered:
+            self.counters["overflow"] += 1
+            return False
+        self.counters["received"] += 1
+        if key in self._pending:
+            self.counters["collapsed"] += 1
+        self._pending[key] = row
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        return True
+
+    def pending_for(self, user_id: int, day_: date | None = None, dashboard_id: int | None = None) -> list[dict]:
+        return [
+            r for (uid, did, _, _), r in self._pending.items()
+            if uid == user_id
+            and (dashboard_id is None or did == dashboard_id)
+            and (day_ is None or r["day"] == day_)
+        ]
+
+    def merge(self, rows: list[dict], user_id: int, day_: date | None = None,
+              dashboard_id: int | None = None) -> list[dict]:
+        """
+        Read-your-writes: overlays buffered votes on rows read from user_votes.
+        rows need "dashboard_id" when they span several dashboards (GET /votes without one).
+        """
+        pending = self.pending_for(user_id, day_, dashboard_id)
+        if not pending:
+            return rows
+        merged = {(r.get("dashboard_id", dashboard_id), r["section"], r["item"]): r for r in rows}
+        for p in pending:
+            merged[(p["dashboard_id"], p["section"], p["item"])] = {
+                **({"dashboard_id": p["dashboard_id"]} if dashboard_id is None else {}),
+                "section": p["section"], "item": p["item"], "value": p["value"],
+            }
+        return list(merged.values())
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._full.clear()
+            try:
+                async with self.engine.begin() as conn:
+                    written = await upsert_votes(conn, list(batch.values()))
+            except Exception:
+                # Put the batch back without overwriting votes that arrived meanwhile
+                self.counters["errors"] += 1
+                for key, row in batch.items():
+                    self._pending.setdefault(key, row)
+                raise
+            self.counters["flushes"] += 1
+            self.counters["rows_written"] += written
+            self.counters["dropped"] += len(batch) - written
+            if self.on_flush is not None:
+                self.on_flush({uid for (uid, _, _, _) in batch})
+            return written
+
+    async def run(self):
+        """
+        Flush loop: every flush_interval seconds, or as soon as max_rows votes are buffered.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("vote flush failed, will retry", extra={"buffered": len(self._pending), "error": str(e)})
+
+    def stats(self) -> dict:
+        flushes = self.counters["flushes"]
+        return {
+            **self.counters,
+            "buffered": len(self._pending),
+            "votes_per_commit": round(self.counters["received"] / flushes, 1) if flushes else None,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "max_rows": self.max_rows,
+            "max_buffered": self.max_buffered,
+        }
@@ -1,4 +1,4 @@
-import { api } from "./client";
+import { api, baseURL } from "./client";
 import { ENDPOINTS } from "./endpoints";
 
 export async function getDashboard() {
@@ -6,7 +6,86 @@ export async function getDashboard() {
   return res.data;
 }
 
+// Same shape as axios errors so callers can check e.response.status / e.response.headers
+function streamError(status, data, retryAfter) {
+  const err = new Error(`Dashboard stream failed (${status})`);
+  err.response = {
+    status,
+    data: data || {},
+    headers: retryAfter != null ? { "retry-after": String(retryAfter) } : {},
+  };
+  return err;
+}
+
+// Streams GET /dashboard/stream (NDJSON). Calls onEvent(event, dashboard) for every
+// event with the dashboard assembled so far; resolves to the full dashboard
+// ({ preferences, dashboard_id, sections }) once the snapshot is persisted.
+// Already-built days arrive as a single "snapshot" event (the server's cached body);
+// "stale" + "day" mark an earlier day's snapshot served while the server is overloaded.
+// Rejects like axios on HTTP errors and on an in-stream "error" event.
+export async function streamDashboard(onEvent, { signal } = {}) {
+  const token = localStorage.getItem("access_token");
+  // include_votes: today's votes come inline in the meta event (no separate GET /votes)
+  const res = await fetch(`${baseURL}${ENDPOINTS.dashboardStream}?include_votes=true`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    signal,
+  });
+
+  if (!res.ok) {
+    throw streamError(res.status, await res.json().catch(() => ({})), res.headers.get("retry-after"));
+  }
+
+  const dashboard = { preferences: null, dashboard_id: null, sections: {}, votes: null, stale: false, day: null };
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+
+  const apply = (line) => {
+    if (!line.trim()) return;
+    const ev = JSON.parse(line);
+    if (ev.event === "snapshot") {
+      dashboard.preferences = ev.preferences;
+      dashboard.dashboard_id = ev.dashboard_id;
+      dashboard.sections = ev.sections || {};
+      dashboard.votes = ev.votes ?? null;
+      dashboard.stale = !!ev.stale;
+      dashboard.day = ev.day ?? null;
+    } else if (ev.event === "error") {
+      reader.cancel().catch(() => {});
+      throw streamError(ev.status, { detail: ev.detail }, ev.retry_after);
+    } else if (ev.event === "meta") {
+      dashboard.preferences = ev.preferences;
+      dashboard.dashboard_id = ev.dashboard_id;
+      dashboard.votes = ev.votes ?? null;
+    } else if (ev.event === "section") {
+      dashboard.sections = { ...dashboard.sections, [ev.name]: ev.section };
+    } else if (ev.event === "done") {
+      dashboard.dashboard_id = ev.dashboard_id;
+    }
+    onEvent?.(ev, dashboard);
+  };
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buf.indexOf("\n")) >= 0) {
+      apply(buf.slice(0, nl));
+      buf = buf.slice(nl + 1);
+    }
+  }
+  apply(buf + decoder.decode());
+
+  if (dashboard.dashboard_id == null) {
+    throw streamError(502, { detail: "Dashboard stream ended early" });
+  }
+  return dashboard;
+}
+
 export async function refreshSection(section) {
-  const res = await api.post(ENDPOINTS.refreshDashboardSection(section));
+  const res = await api.post(ENDPOINTS.refreshDashboardSection(section), null, {
+    params: { include_votes: true },
+  });
   return res.data;
 }
@@ -4,6 +4,8 @@ export const ENDPOINTS = {
   me: "/me",
   onboarding: "/onboarding",
   dashboard: "/dashboard",
+  dashboardStream: "/dashboard/stream",
   refreshDashboardSection: (section) => `/dashboard/refresh/${section}`,
   votes: "/votes",
+  votesBatch: "/votes/batch",
 };
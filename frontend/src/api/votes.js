@@ -1,6 +1,11 @@
 import { api } from "./client";
 import { ENDPOINTS } from "./endpoints";
 
+const VOTE_BATCH_DELAY_MS = 300;
+
+let queued = []; // [{ vote, resolve, reject }]
+let flushTimer = null;
+
 export async function saveVote({ dashboard_id, section, item, value }) {
   const res = await api.post(ENDPOINTS.votes, {
     dashboard_id,
@@ -11,6 +16,34 @@ export async function saveVote({ dashboard_id, section, item, value }) {
   return res.data; // { message: "vote saved" }
 }
 
+export async function saveVotes(votes) {
+  const res = await api.post(ENDPOINTS.votesBatch, { votes });
+  return res.data; // { message: "votes saved", count }
+}
+
+async function flushQueuedVotes() {
+  const batch = queued;
+  queued = [];
+  flushTimer = null;
+  if (!batch.length) return;
+
+  try {
+    const data = await saveVotes(batch.map((q) => q.vote));
+    batch.forEach((q) => q.resolve(data));
+  } catch (e) {
+    batch.forEach((q) => q.reject(e));
+  }
+}
+
+// Clicks within VOTE_BATCH_DELAY_MS are sent together in one POST /votes/batch.
+// Resolves/rejects with the batch, so callers can still roll back their optimistic state.
+export function queueVote(vote) {
+  return new Promise((resolve, reject) => {
+    queued.push({ vote, resolve, reject });
+    if (!flushTimer) flushTimer = setTimeout(flushQueuedVotes, VOTE_BATCH_DELAY_MS);
+  });
+}
+
 export async function getVotesToday({ dashboard_id } = {}) {
   const qs = new URLSearchParams({ date: "today" });
   if (dashboard_id != null) qs.set("dashboard_id", String(dashboard_id));
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
-import { getDashboard, refreshSection } from "../api/dashboard";
-import { saveVote, getVotesToday } from "../api/votes";
+import { streamDashboard, refreshSection } from "../api/dashboard";
+import { queueVote, getVotesToday } from "../api/votes";
 import { useAuth } from "../auth/AuthProvider";
 import { useNavigate } from "react-router-dom";
 import Shell from "../ui/Shell";
@@ -59,6 +59,18 @@ function MiniLineChart({ chart }) {
   }
   if (!Number.isFinite(minP) || !Number.isFinite(maxP) || minP === maxP) return null;
 
+  // x is time-based: downsampled series are not evenly spaced
+  let minT = Infinity,
+    maxT = -Infinity;
+  for (const [, arr] of seriesEntries) {
+    if (arr[0][0] < minT) minT = arr[0][0];
+    if (arr[arr.length - 1][0] > maxT) maxT = arr[arr.length - 1][0];
+  }
+  const toX = (ts, i, n) =>
+    maxT > minT
+      ? PAD + ((ts - minT) * (W - PAD * 2)) / (maxT - minT)
+      : PAD + (i * (W - PAD * 2)) / (n - 1);
+
   const toY = (v) => {
     const t = (v - minP) / (maxP - minP);
     return H - PAD - t * (H - PAD * 2);
@@ -70,7 +82,7 @@ function MiniLineChart({ chart }) {
     for (let i = 0; i < n; i++) {
       const v = Number(arr[i]?.[1]);
       if (!Number.isFinite(v)) continue;
-      const x = PAD + (i * (W - PAD * 2)) / (n - 1);
+      const x = toX(arr[i][0], i, n);
       const y = toY(v);
       d += (d ? " L " : "M ") + `${x} ${y}`;
     }
@@ -117,33 +129,39 @@ export default function Dashboard() {
   async function load() {
     setErr("");
     try {
-      const d = await getDashboard();
-      setDashboardId(d.dashboard_id);
-      setData(prev => {
-        if (!prev) return d;
-        return {
-          ...prev,
-          ...d,
+      // Render each section as soon as it arrives instead of waiting for the slowest one
+      const d = await streamDashboard((ev, partial) => {
+        if (ev.event === "meta" || ev.event === "snapshot") setDashboardId(partial.dashboard_id);
+        setData(prev => ({
+          ...(prev || {}),
+          preferences: partial.preferences,
+          dashboard_id: partial.dashboard_id,
+          stale: partial.stale,
+          day: partial.day,
           sections: {
-            ...(prev.sections || {}),
-            ...(d.sections || {}),
+            ...(prev?.sections || {}),
+            ...partial.sections,
           },
-        };
+        }));
       });
+      setDashboardId(d.dashboard_id);
 
-      const todayVotes = await getVotesToday({ dashboard_id: d.dashboard_id });
+      const todayVotes = d.votes ?? await getVotesToday({ dashboard_id: d.dashboard_id });
       const map = {};
       for (const v of todayVotes) {
         map[`${v.section}::${v.item}`] = v.value;
       }
-      setVotes(map);
+      // Clicks made while sections were still streaming are newer than the server's list
+      setVotes((prev) => ({ ...map, ...prev }));
     } catch (e2) {
       if (e2?.response?.status === 401) {
         logout();
         nav("/login");
         return;
       }
-      setErr(e2?.response?.data?.detail || "Failed to load dashboard");
+      const retryAfter = e2?.response?.headers?.["retry-after"];
+      const detail = e2?.response?.data?.detail || "Failed to load dashboard";
+      setErr(retryAfter ? `${detail} (try again in ${retryAfter}s)` : detail);
     }
   }
 
@@ -157,7 +175,7 @@ export default function Dashboard() {
       setDashboardId(d.dashboard_id);
 
       // reload today's votes (content may change)
-      const todayVotes = await getVotesToday({ dashboard_id: d.dashboard_id });
+      const todayVotes = d.votes ?? await getVotesToday({ dashboard_id: d.dashboard_id });
       const map = {};
       for (const v of todayVotes) {
         map[`${v.section}::${v.item}`] = v.value;
@@ -170,6 +188,10 @@ export default function Dashboard() {
         nav("/login");
         return;
       }
+      // 429 (refresh rate limit) / 503 (server busy) carry Retry-After
+      const retryAfter = e?.response?.headers?.["retry-after"];
+      const detail = e?.response?.data?.detail || "Refresh failed";
+      push(retryAfter ? `${detail} (try again in ${retryAfter}s)` : detail, "error", 3000);
     } finally {
       setRefreshBusy((p) => {
         const copy = { ...p };
@@ -191,7 +213,7 @@ export default function Dashboard() {
 
     try {
       const did = dashboardId ?? data?.dashboard_id;
-      await saveVote({ dashboard_id: did, section, item, value });
+      await queueVote({ dashboard_id: did, section, item, value });
 
     } catch {
       setVotes((p) => ({ ...p, [key]: current }));
@@ -257,7 +279,7 @@ export default function Dashboard() {
 
   return (
     <Shell
-      title="Today's Dashboard"
+      title={data.stale ? "Dashboard" : "Today's Dashboard"}
       right={
         <div className="row">
           <Button
@@ -272,6 +294,12 @@ export default function Dashboard() {
         </div>
       }
     >
+      {data.stale ? (
+        <div className="badge" style={{ marginBottom: 12 }}>
+          Showing data from {data.day}: today's dashboard couldn't be built right now. Reload in a moment.
+        </div>
+      ) : null}
+
       <div className="dashboardGrid2x2">
         <Section
           title="Coin Prices"